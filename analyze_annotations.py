@@ -1,20 +1,11 @@
-import json
-import numpy as np
-from PIL import Image
-from collections import defaultdict
+from coco_index import CocoIndex
+from label_stats import stats_for, value_counts
 
-# Load COCO annotations
-with open('train/_annotations.coco.json', 'r') as f:
-    coco_data = json.load(f)
+# Load the shared COCO index
+index = CocoIndex.load('train/_annotations.coco.json')
 
 # Create mappings
-image_id_to_filename = {img['id']: img['file_name'] for img in coco_data['images']}
-filename_to_image_id = {img['file_name']: img['id'] for img in coco_data['images']}
-
-# Group annotations by image
-image_annotations = defaultdict(list)
-for ann in coco_data['annotations']:
-    image_annotations[ann['image_id']].append(ann)
+image_id_to_filename = {img_id: img['file_name'] for img_id, img in index.images.items()}
 
 # Analyze specific problematic cases
 problematic_cases = {
@@ -42,30 +33,29 @@ for case_type, case_numbers in problematic_cases.items():
             print(f"  Case {case_num} -> Image ID {img_id}, Filename: {filename}")
             
             # Check annotations for this image
-            annotations = image_annotations[img_id]
+            annotations = index.annotations_for(img_id)
             print(f"    Annotations: {len(annotations)}")
             
             for ann in annotations:
                 cat_id = ann['category_id']
-                cat_name = next(cat['name'] for cat in coco_data['categories'] if cat['id'] == cat_id)
+                cat_name = index.category_name(cat_id)
                 print(f"      - Category ID: {cat_id}, Name: {cat_name}")
             
             # Check the generated mask
             mask_path = f"nnunet_dataset/labelsTr/{case_id}.png"
-            try:
-                mask = np.array(Image.open(mask_path))
-                unique_vals = np.unique(mask)
-                print(f"    Mask unique values: {unique_vals}")
-                for val in unique_vals:
-                    count = np.sum(mask == val)
+            record = stats_for(mask_path)
+            if record is not None:
+                counts = value_counts(record)
+                print(f"    Mask unique values: {sorted(counts)}")
+                for val, count in sorted(counts.items()):
                     print(f"      Value {val}: {count} pixels")
-            except FileNotFoundError:
+            else:
                 print(f"    Mask file not found: {mask_path}")
         else:
             print(f"  Case {case_num}: No matching image found")
 
 print("\n=== Category Mapping Reference ===")
-for cat in coco_data['categories']:
+for cat in index.categories.values():
     print(f"Category ID {cat['id']}: {cat['name']}")
 
 print("\nExpected nnU-Net mapping:")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite over synthetic datasets
+Generates a synthetic COCO export (synthetic_coco) per scale and times every
+stage of the pipeline on it:
+
+  decode     decode_rle_mask on every annotation
+  rasterize  rasterize_annotations per image (bitmask + priority LUT)
+  convert    convert_coco_to_nnunet with the visual variants
+  verify     verify_nnunet_dataset_full
+  stats      collect_label_stats, cold (no sidecar)
+  visualize  render_label_directory into a scratch directory
+
+Each stage runs in a fresh process, so its peak RSS is its own. Images/s,
+wall time, peak RSS and output bytes of every stage are appended as one
+record per run to a JSON lines history, and each stage is compared with the
+last run of the same scale: a stage that lost more than the tolerance in
+images/s is reported as a regression.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HISTORY_NAME = "benchmark_history.jsonl"
+
+STAGES = ('decode', 'rasterize', 'convert', 'verify', 'stats', 'visualize')
+
+# name -> synthetic_coco.generate_coco parameters
+SCALES = {
+    'small': {'num_images': 100, 'width': 512, 'height': 512, 'polygons_per_image': (1, 4),
+              'vertices': (8, 32), 'rle_fraction': 0.25},
+    'large': {'num_images': 1000, 'width': 512, 'height': 512, 'polygons_per_image': (1, 4),
+              'vertices': (8, 32), 'rle_fraction': 0.25},
+    'hires': {'num_images': 100, 'width': 1024, 'height': 1024, 'polygons_per_image': (2, 8),
+              'vertices': (32, 128), 'rle_fraction': 0.5},
+}
+
+def _vm_hwm_kb():
+    """High-water RSS of this process from /proc (Linux), or None"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def _peak_rss_mb():
+    """
+    Peak RSS of this process and its finished children, in MB, or None where
+    it can't be measured. On Linux ru_maxrss of a spawned process still holds
+    the parent's peak (it survives fork+exec), so the process's own peak is
+    read from VmHWM, which starts afresh with the new program.
+    """
+    own = _vm_hwm_kb()
+    own = own / 1e3 if own is not None else None
+    if resource is None:
+        return own
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    scale = 1e6 if sys.platform == 'darwin' else 1e3
+    if own is None:
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return max(own, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+def _dir_bytes(*paths):
+    total = 0
+    for path in paths:
+        for root, _, files in os.walk(path):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+def _run_stage(stage, coco_dir, dataset_dir, scratch_dir, workers):
+    """Run one stage; returns (images processed, output bytes)"""
+    json_path = Path(coco_dir) / '_annotations.coco.json'
+    labels_dir = Path(dataset_dir) / 'labelsTr'
+
+    if stage in ('decode', 'rasterize'):
+        from coco_to_nnunet_converter import decode_rle_mask, rasterize_annotations
+        with open(json_path, 'r') as f:
+            coco = json.load(f)
+        annotations_by_image = {}
+        for ann in coco['annotations']:
+            annotations_by_image.setdefault(ann['image_id'], []).append(ann)
+        for img in coco['images']:
+            annotations = annotations_by_image.get(img['id'], [])
+            if stage == 'decode':
+                for ann in annotations:
+                    decode_rle_mask(ann['segmentation'], img['height'], img['width'])
+            else:
+                rasterize_annotations(annotations, img['height'], img['width'])
+        return len(coco['images']), 0
+
+    if stage == 'convert':
+        from coco_to_nnunet_converter import convert_coco_to_nnunet
+        from label_render import DEFAULT_VARIANTS
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+        count = convert_coco_to_nnunet(str(json_path), str(coco_dir), str(dataset_dir),
+                                       workers=workers, variants=DEFAULT_VARIANTS)
+        return count, _dir_bytes(dataset_dir)
+
+    if stage == 'verify':
+        from verify_nnunet_dataset import verify_nnunet_dataset_full
+        Path(scratch_dir).mkdir(parents=True, exist_ok=True)
+        report_path = Path(scratch_dir) / 'verification_report.json'
+        report = verify_nnunet_dataset_full(dataset_dir, workers=workers, report_path=report_path)
+        if report['violations']:
+            raise RuntimeError(f"Synthetic dataset failed verification: {report['violations'][:3]}")
+        return report['num_pairs'], os.path.getsize(report_path)
+
+    if stage == 'stats':
+        from label_stats import STATS_NAME, collect_label_stats
+        sidecar_path = labels_dir / STATS_NAME
+        if sidecar_path.exists():
+            sidecar_path.unlink()
+        stats = collect_label_stats(labels_dir, workers=workers)
+        return len(stats), os.path.getsize(sidecar_path)
+
+    if stage == 'visualize':
+        from label_render import DEFAULT_VARIANTS, render_label_directory
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        count = render_label_directory(labels_dir, base_dir=scratch_dir, variants=DEFAULT_VARIANTS)
+        return count, _dir_bytes(scratch_dir)
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+def _timed_stage(stage, coco_dir, dataset_dir, scratch_dir, workers):
+    """Entry point of the per-stage process; stage output is swallowed"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        images, output_bytes = _run_stage(stage, coco_dir, dataset_dir, scratch_dir, workers)
+        seconds = time.perf_counter() - start
+    peak_rss = _peak_rss_mb()
+    return {
+        'images': images,
+        'seconds': round(seconds, 4),
+        'images_per_s': round(images / seconds, 2) if seconds > 0 else None,
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+        'output_bytes': output_bytes,
+    }
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(scale='small', config=None, stages=STAGES, workers=1, seed=0, work_dir=None):
+    """
+    Generate the synthetic dataset of one scale (or an explicit generate_coco
+    config) and time every stage in its own process. Returns the run record.
+    """
+    from synthetic_coco import generate_coco
+
+    config = dict(config or SCALES[scale])
+    tmp = tempfile.TemporaryDirectory(prefix='benchmark_') if work_dir is None else None
+    work_dir = Path(tmp.name if tmp else work_dir)
+    coco_dir = work_dir / 'train'
+    dataset_dir = work_dir / 'nnunet_dataset'
+    scratch_dir = work_dir / 'scratch'
+    try:
+        start = time.perf_counter()
+        generate_coco(coco_dir, seed=seed, **config)
+        print(f"[{scale}] generated {config['num_images']} images in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        spawn = get_context('spawn')
+        for stage in stages:
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                results[stage] = executor.submit(_timed_stage, stage, str(coco_dir), str(dataset_dir),
+                                                 str(scratch_dir), workers).result()
+            r = results[stage]
+            print(f"[{scale}] {stage:<10} {r['seconds']:8.2f}s {r['images_per_s'] or 0:9.1f} images/s "
+                  f"{r['peak_rss_mb'] or 0:8.1f} MB peak {r['output_bytes'] / 1e6:9.2f} MB out")
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'scale': scale,
+        'config': json.loads(json.dumps(config)),
+        'seed': seed,
+        'workers': workers,
+        'stages': results,
+    }
+
+def load_history(history_path=HISTORY_NAME):
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def append_history(record, history_path=HISTORY_NAME):
+    with open(history_path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+def compare_to_previous(record, history, tolerance=0.10):
+    """
+    Compare each stage with the most recent earlier run of the same scale,
+    config and worker count. Returns [(stage, previous images/s, images/s,
+    relative change)] for stages that got slower by more than tolerance.
+    """
+    previous = next((r for r in reversed(history)
+                     if r['scale'] == record['scale'] and r['config'] == record['config']
+                     and r['workers'] == record['workers']), None)
+    if previous is None:
+        return []
+    regressions = []
+    for stage, result in record['stages'].items():
+        before = previous['stages'].get(stage, {}).get('images_per_s')
+        after = result['images_per_s']
+        if before and after is not None:
+            change = after / before - 1
+            print(f"[{record['scale']}] {stage:<10} {before:9.1f} -> {after:9.1f} images/s ({change:+.1%})"
+                  f" vs {previous.get('commit') or previous['timestamp']}")
+            if change < -tolerance:
+                regressions.append((stage, before, after, change))
+    return regressions
+
+if __name__ == "__main__":
+    scales = ['small']  # add 'large' / 'hires' to see scaling behaviour
+    workers = 1
+    tolerance = 0.10
+    history_path = HISTORY_NAME
+
+    history = load_history(history_path)
+    regressions = []
+    for scale in scales:
+        record = run_benchmarks(scale, workers=workers)
+        regressions += [(scale, *r) for r in compare_to_previous(record, history, tolerance)]
+        append_history(record, history_path)
+        history.append(record)
+
+    print(f"\nHistory: {history_path} ({len(history)} runs)")
+    if regressions:
+        print(f"✗ {len(regressions)} stage(s) more than {tolerance:.0%} slower than the previous run:")
+        for scale, stage, before, after, change in regressions:
+            print(f"  {scale}/{stage}: {before:.1f} -> {after:.1f} images/s ({change:+.1%})")
+        sys.exit(1)
+    print("✓ No regressions")
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+SQLite case catalog
+The converter writes case_catalog.sqlite next to dataset.json with one row
+per converted case: Roboflow file name, original name and rf hash, COCO
+image id, case ID, plane and patient (from the Roboflow user tags), image
+size, output paths and the pixel count of every label in its label map.
+Output paths are stored relative to the dataset directory and joined with
+it on read, so a moved or copied dataset resolves to its own files.
+Reconciliation scripts look cases up here by indexed queries instead of
+scanning directories or guessing case numbers from file names.
+"""
+
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+CATALOG_NAME = "case_catalog.sqlite"
+
+PLANES = ('Axial', 'Coronal', 'Sagittal')
+
+RF_HASH = re.compile(r'\.rf\.([0-9a-f]+)\.')
+
+CASE_ID = re.compile(r'case\d+')
+
+SCHEMA = """
+CREATE TABLE cases (
+    case_id TEXT PRIMARY KEY,
+    image_id INTEGER NOT NULL,
+    file_name TEXT NOT NULL,
+    original_name TEXT,
+    rf_hash TEXT,
+    plane TEXT,
+    patient TEXT,
+    width INTEGER,
+    height INTEGER,
+    image_path TEXT,
+    label_path TEXT
+);
+CREATE TABLE case_labels (
+    case_id TEXT NOT NULL REFERENCES cases(case_id),
+    label INTEGER NOT NULL,
+    pixels INTEGER NOT NULL,
+    PRIMARY KEY (case_id, label)
+);
+CREATE INDEX cases_image_id ON cases(image_id);
+CREATE INDEX cases_file_name ON cases(file_name);
+CREATE INDEX cases_original_name ON cases(original_name);
+CREATE INDEX cases_rf_hash ON cases(rf_hash);
+CREATE INDEX cases_plane ON cases(plane);
+CREATE INDEX case_labels_label ON case_labels(label, case_id);
+"""
+
+def image_tags(img_info):
+    """(plane, patient) from a Roboflow image record's user tags"""
+    plane = patient = None
+    for tag in img_info.get('extra', {}).get('user_tags', []):
+        if tag in PLANES:
+            plane = tag
+        elif tag.startswith('Patient'):
+            patient = tag
+    return plane, patient
+
+def catalog_row(case_id, img_info, image_path=None, label_path=None, label_counts=None):
+    """Catalog entry for one case"""
+    plane, patient = image_tags(img_info)
+    rf_match = RF_HASH.search(img_info['file_name'])
+    return {
+        'case_id': case_id,
+        'image_id': img_info['id'],
+        'file_name': img_info['file_name'],
+        'original_name': img_info.get('extra', {}).get('name'),
+        'rf_hash': rf_match.group(1) if rf_match else None,
+        'plane': plane,
+        'patient': patient,
+        'width': img_info.get('width'),
+        'height': img_info.get('height'),
+        'image_path': image_path,
+        'label_path': label_path,
+        'label_counts': label_counts or {},
+    }
+
+COLUMNS = ('case_id', 'image_id', 'file_name', 'original_name', 'rf_hash', 'plane',
+           'patient', 'width', 'height', 'image_path', 'label_path')
+
+PATH_COLUMNS = ('image_path', 'label_path')
+
+def _relative(path, dataset_dir):
+    return path and Path(os.path.relpath(os.path.abspath(path), os.path.abspath(dataset_dir))).as_posix()
+
+def write_catalog(output_dir, rows):
+    """Write a fresh catalog for rows, replacing any previous one atomically"""
+    path = Path(output_dir) / CATALOG_NAME
+    tmp_path = path.with_name(path.name + '.tmp')
+    rows = [dict(row, **{key: _relative(row[key], output_dir) for key in PATH_COLUMNS}) for row in rows]
+    _write_catalog_file(tmp_path, rows)
+    os.replace(tmp_path, path)
+    return path
+
+def _write_catalog_file(path, rows):
+    if os.path.exists(path):
+        os.unlink(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            f"INSERT INTO cases ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+            ([row[c] for c in COLUMNS] for row in rows))
+        conn.executemany(
+            "INSERT INTO case_labels (case_id, label, pixels) VALUES (?, ?, ?)",
+            ((row['case_id'], int(label), pixels) for row in rows
+             for label, pixels in row['label_counts'].items()))
+        conn.commit()
+    finally:
+        conn.close()
+
+def remap_catalog(src_path, dst_path, rename):
+    """
+    Write a copy of the catalog at src_path to dst_path with its files moved
+    by rename(path) -> new path, or None for a deleted file. Cases whose
+    image or label is deleted are dropped; moved cases take the case ID of
+    their new file names.
+    """
+    conn = sqlite3.connect(f"file:{src_path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = [dict(row) for row in conn.execute("SELECT * FROM cases")]
+        label_counts = {}
+        for row in conn.execute("SELECT case_id, label, pixels FROM case_labels"):
+            label_counts.setdefault(row['case_id'], {})[row['label']] = row['pixels']
+    finally:
+        conn.close()
+
+    # rename() sees full paths; stored paths stay relative to the dataset
+    dataset_dir = Path(src_path).parent
+    remapped = []
+    for row in rows:
+        row['label_counts'] = label_counts.get(row['case_id'], {})
+        full_paths = {key: row[key] and str(dataset_dir / row[key]) for key in PATH_COLUMNS}
+        paths = {key: full_paths[key] and rename(full_paths[key]) for key in PATH_COLUMNS}
+        if any(full_paths[key] and paths[key] is None for key in paths):
+            continue
+        for key, new_path in paths.items():
+            if new_path and new_path != full_paths[key]:
+                row['case_id'] = CASE_ID.match(os.path.basename(new_path)).group(0)
+            row[key] = _relative(new_path, dataset_dir)
+        remapped.append(row)
+    _write_catalog_file(dst_path, sorted(remapped, key=lambda row: row['case_id']))
+
+def update_label_counts(dataset_dir, label_counts):
+    """
+    Replace the label pixel counts of the cases in label_counts
+    ({case_id: {label: pixels}}) in one transaction, for label maps
+    rewritten after conversion
+    """
+    conn = sqlite3.connect(Path(dataset_dir) / CATALOG_NAME)
+    try:
+        with conn:
+            for case_id, counts in label_counts.items():
+                conn.execute("DELETE FROM case_labels WHERE case_id = ?", (case_id,))
+                conn.executemany("INSERT INTO case_labels (case_id, label, pixels) VALUES (?, ?, ?)",
+                                 ((case_id, int(label), pixels) for label, pixels in counts.items()))
+    finally:
+        conn.close()
+
+class CaseCatalog:
+    """Read-only queries over a catalog written by the converter"""
+
+    def __init__(self, dataset_dir='nnunet_dataset'):
+        self.dataset_dir = Path(dataset_dir)
+        self.path = self.dataset_dir / CATALOG_NAME
+        if not self.path.exists():
+            raise FileNotFoundError(f"No case catalog at {self.path}; run the converter first")
+        self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        self.conn.row_factory = sqlite3.Row
+
+    def close(self):
+        self.conn.close()
+
+    def _row(self, row):
+        """Row as a dict with its output paths joined to the dataset directory"""
+        row = dict(row)
+        for key in PATH_COLUMNS:
+            if row.get(key):
+                row[key] = str(self.dataset_dir / row[key])
+        return row
+
+    def _one(self, query, *args):
+        row = self.conn.execute(query, args).fetchone()
+        return self._row(row) if row is not None else None
+
+    def _all(self, query, *args):
+        return [self._row(row) for row in self.conn.execute(query, args)]
+
+    def case(self, case_id):
+        return self._one("SELECT * FROM cases WHERE case_id = ?", case_id)
+
+    def case_for_image(self, image_id):
+        return self._one("SELECT * FROM cases WHERE image_id = ?", image_id)
+
+    def case_for_file(self, file_name):
+        """Case of a Roboflow file name or of an original name such as Cyst-321-.jpg"""
+        return self._one("SELECT * FROM cases WHERE file_name = ? OR original_name = ?", file_name, file_name)
+
+    def case_for_rf_hash(self, rf_hash):
+        return self._one("SELECT * FROM cases WHERE rf_hash = ?", rf_hash)
+
+    def cases(self):
+        return self._all("SELECT * FROM cases ORDER BY case_id")
+
+    def cases_in_plane(self, plane):
+        """Cases of one plane; plane=None gives the untagged ones"""
+        if plane is None:
+            return self._all("SELECT * FROM cases WHERE plane IS NULL ORDER BY case_id")
+        return self._all("SELECT * FROM cases WHERE plane = ? ORDER BY case_id", plane)
+
+    def cases_with_label(self, label):
+        return self._all(
+            "SELECT cases.* FROM case_labels JOIN cases USING (case_id) "
+            "WHERE case_labels.label = ? AND case_labels.pixels > 0 ORDER BY case_id", label)
+
+    def label_counts(self, case_id):
+        """{label: pixels} of one case's label map"""
+        return {row['label']: row['pixels'] for row in
+                self._all("SELECT label, pixels FROM case_labels WHERE case_id = ?", case_id)}
+
+    def plane_counts(self):
+        return {row['plane']: row['n'] for row in
+                self._all("SELECT plane, COUNT(*) AS n FROM cases GROUP BY plane")}
+
+if __name__ == "__main__":
+    catalog = CaseCatalog("nnunet_dataset")
+    print(f"Cases: {len(catalog.cases())}")
+    print(f"Per plane: {catalog.plane_counts()}")
+    print(f"With kidney (1): {len(catalog.cases_with_label(1))}")
+    print(f"With cyst (2): {len(catalog.cases_with_label(2))}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Persistent case ID registry
+The converter used to number cases by position in the COCO image list, so
+inserting or removing one image shifted every later case ID. The registry
+instead remembers which caseNNN each source image was given, keyed by its
+identity, and hands new images the next unused number. Existing IDs never
+move and numbers are never reused, so a new export only adds files.
+
+Identity is the COCO file name by default; Roboflow names carry a content
+hash (Cyst-321-_jpg.rf.<hash>.jpg). identity='sha256' keys on the source
+image bytes instead, which survives renames.
+
+The registry lives in the output directory as case_registry.json.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from conversion_manifest import file_sha256
+
+REGISTRY_NAME = "case_registry.json"
+REGISTRY_VERSION = 1
+
+class CaseRegistry:
+    """identity key -> case number, plus the next number to hand out"""
+
+    def __init__(self, path, cases=None, next_number=1, identity='file_name'):
+        self.path = Path(path)
+        self.cases = cases or {}
+        self.next_number = next_number
+        self.identity = identity
+
+    @classmethod
+    def load(cls, output_dir, identity='file_name'):
+        """Open the registry of output_dir, or start an empty one"""
+        path = Path(output_dir) / REGISTRY_NAME
+        if not path.exists():
+            return cls(path, identity=identity)
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('identity', 'file_name') != identity:
+            raise ValueError(f"{path} is keyed by {data.get('identity')}, not {identity}")
+        return cls(path, data['cases'], data['next_number'], identity)
+
+    def save(self):
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': REGISTRY_VERSION,
+                'identity': self.identity,
+                'next_number': self.next_number,
+                'cases': self.cases,
+            }, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def identity_key(self, img_info, images_dir=None):
+        """Key identifying the source image of a COCO image record"""
+        if self.identity == 'sha256':
+            src_path = Path(images_dir) / img_info['file_name']
+            if src_path.exists():
+                return f"sha256:{file_sha256(src_path)}"
+        return f"file_name:{img_info['file_name']}"
+
+    def case_number(self, key):
+        """Number registered for key, allocating the next free one if new"""
+        if key not in self.cases:
+            self.cases[key] = self.next_number
+            self.next_number += 1
+        return self.cases[key]
+
+    def _duplicate_key(self, key, img_info, images_dir, used):
+        """
+        Key for a record whose identity key was already taken in this export.
+        COCO image ids are renumbered on every Roboflow export, so duplicates
+        are told apart by the other stable identity: the content hash under
+        file_name identity, the file name under sha256 identity. Records that
+        still collide (the same file listed twice) are numbered in export order.
+        """
+        src_path = Path(images_dir) / img_info['file_name'] if images_dir is not None else None
+        if self.identity == 'sha256' or src_path is None or not src_path.exists():
+            key = f"{key}#file_name:{img_info['file_name']}"
+        else:
+            key = f"{key}#sha256:{file_sha256(src_path)}"
+        occurrence, candidate = 1, key
+        while candidate in used:
+            occurrence += 1
+            candidate = f"{key}#{occurrence}"
+        return candidate
+
+    def assign(self, images, images_dir=None):
+        """
+        Case IDs for a list of COCO image records, in the same order.
+        New images are numbered in list order after every existing case.
+        """
+        case_ids = []
+        used = set()
+        for img_info in images:
+            key = self.identity_key(img_info, images_dir)
+            if key in used:
+                # Same source twice in one export: keep the records apart
+                key = self._duplicate_key(key, img_info, images_dir, used)
+            used.add(key)
+            case_ids.append(f"case{self.case_number(key):03d}")
+        return case_ids
+
+def positional_case_ids(images):
+    """The original numbering: caseNNN by position in the image list"""
+    return [f"case{i+1:03d}" for i in range(len(images))]
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Per-case category bitmasks
+A label map keeps one class per pixel, so wherever a cyst overlaps the kidney
+the kidney is lost. A category bitmask keeps every category instead: one bit
+per COCO category in a uint8 image (bit order = sorted category ids, so up
+to 8 categories).
+
+Any label map is then a single lookup through a 256-entry table built from a
+priority order and label mapping, so changing priorities or label ids means
+recompositing the cached bitmasks rather than re-rasterizing polygons.
+The converter caches them under <output_dir>/bitmasksTr, as PNGs next to a
+categories.json that records which bit is which category.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from case_catalog import CATALOG_NAME, update_label_counts
+from coco_rle import rle_to_mask
+from conversion_manifest import MANIFEST_NAME, load_manifest, output_stat, write_manifest
+from label_render import DEFAULT_VARIANTS, build_luts, save_variants
+
+BITMASK_DIR = "bitmasksTr"
+CATEGORIES_NAME = "categories.json"
+
+def category_bits(categories):
+    """category_id -> bit index, assigned in sorted category id order"""
+    category_ids = sorted(cat['id'] for cat in categories)
+    if len(category_ids) > 8:
+        raise ValueError(f"A uint8 bitmask holds at most 8 categories, got {len(category_ids)}")
+    return {category_id: bit for bit, category_id in enumerate(category_ids)}
+
+def draw_polygon(draw, polygon, fill):
+    """Draw one flat [x1, y1, x2, y2, ...] COCO polygon"""
+    if len(polygon) >= 6:  # At least 3 points (x,y pairs)
+        points = [(polygon[i], polygon[i+1]) for i in range(0, len(polygon), 2)]
+        draw.polygon(points, fill=fill)
+
+def rasterize_bitmask(annotations, height, width, bits):
+    """
+    Rasterize all annotations of one image into a uint8 bitmask, setting bit
+    bits[category_id] wherever an annotation of that category covers a pixel.
+    Annotations of categories missing from bits are skipped.
+    """
+    bitmask = np.zeros((height, width), dtype=np.uint8)
+
+    annotations_by_category = {}
+    for ann in annotations:
+        if 'segmentation' in ann and ann.get('category_id') in bits:
+            annotations_by_category.setdefault(ann['category_id'], []).append(ann)
+
+    for category_id, category_annotations in annotations_by_category.items():
+        flag = 1 << bits[category_id]
+        canvas = Image.new('L', (width, height), 0)
+        draw = ImageDraw.Draw(canvas)
+        for ann in category_annotations:
+            segmentation = ann['segmentation']
+            if isinstance(segmentation, list):
+                for polygon in segmentation:
+                    draw_polygon(draw, polygon, flag)
+            elif isinstance(segmentation, dict) and 'counts' in segmentation:
+                canvas.paste(flag, mask=Image.fromarray(rle_to_mask(segmentation, height, width) * 255))
+        bitmask |= np.array(canvas)
+
+    return bitmask
+
+def priority_lut(bits, label_priority):
+    """
+    256-entry table mapping a bitmask value to a label.
+    label_priority is [(category_id, label), ...] in draw order: a pixel gets
+    the label of the last listed category whose bit is set, 0 if none.
+    """
+    codes = np.arange(256)
+    lut = np.zeros(256, dtype=np.uint8)
+    for category_id, label in label_priority:
+        if category_id in bits:
+            lut[(codes >> bits[category_id]) & 1 == 1] = label
+    return lut
+
+def dataset_labels(categories, label_priority):
+    """dataset.json "labels" of a label_priority: background plus every category name, by label value"""
+    names = {cat['id']: cat['name'] for cat in categories}
+    labels = {'background': 0}
+    for category_id, label in sorted(label_priority, key=lambda pair: pair[1]):
+        labels[names.get(category_id, f"category_{category_id}")] = label
+    return labels
+
+def composite(bitmask, lut):
+    """Label map of a bitmask under a priority_lut()"""
+    return lut[bitmask]
+
+def save_categories(bitmask_dir, categories):
+    """Record which bit stands for which category"""
+    bits = category_bits(categories)
+    records = [{'bit': bits[cat['id']], 'id': cat['id'], 'name': cat['name']}
+               for cat in sorted(categories, key=lambda cat: cat['id'])]
+    with open(Path(bitmask_dir) / CATEGORIES_NAME, 'w') as f:
+        json.dump(records, f, indent=2)
+
+def load_categories(bitmask_dir):
+    """Category id -> bit index of a bitmask cache, plus the category records"""
+    with open(Path(bitmask_dir) / CATEGORIES_NAME, 'r') as f:
+        records = json.load(f)
+    return {record['id']: record['bit'] for record in records}, records
+
+def recomposite_labels(bitmask_dir, labels_dir, label_priority, label_writer=None):
+    """
+    Rebuild every label map from the cached bitmasks with a new priority
+    order / label mapping. What the converter derived from the label maps of
+    the dataset next to labels_dir follows along: the labels of its
+    dataset.json, the visual variants, the case catalog's label counts and
+    the conversion manifest. Manifest records take the new label_priority,
+    so an incremental run with it keeps the result and one with the old
+    priority converts those cases again.
+
+    The label writer defaults to the dataset's file_ending; a writer with
+    another ending raises ValueError, since the images keep theirs.
+    Returns the number of label maps written.
+    """
+    from output_writers import make_writer
+
+    bitmask_dir, labels_dir = Path(bitmask_dir), Path(labels_dir)
+    dataset_dir = labels_dir.parent
+    dataset_json_path = dataset_dir / 'dataset.json'
+    dataset_json = None
+    if dataset_json_path.exists():
+        with open(dataset_json_path, 'r') as f:
+            dataset_json = json.load(f)
+    file_ending = dataset_json.get('file_ending') if dataset_json else None
+    if label_writer is None and file_ending:
+        label_writer = file_ending.lstrip('.')
+    label_writer = make_writer(label_writer)
+    if file_ending and label_writer.file_ending != file_ending:
+        raise ValueError(f"Label writer {label_writer.spec} writes {label_writer.file_ending} files, "
+                         f"but {dataset_dir} uses {file_ending}")
+
+    labels_dir.mkdir(parents=True, exist_ok=True)
+    bits, categories = load_categories(bitmask_dir)
+    lut = priority_lut(bits, label_priority)
+
+    # Variants as the converter wrote them, else the default ones present
+    records = load_manifest(dataset_dir)
+    settings = next(iter(records.values()), {}).get('settings')
+    if settings is not None:
+        variants, paletted = settings.get('variants', {}), settings.get('paletted_variants', False)
+    else:
+        variants = {name: variant for name, variant in DEFAULT_VARIANTS.items() if (dataset_dir / name).is_dir()}
+        paletted = any(Image.open(path).mode == 'P'
+                       for name in variants for path in list((dataset_dir / name).glob('*.png'))[:1])
+    luts = build_luts(variants)
+
+    bitmask_files = sorted(f for f in os.listdir(bitmask_dir) if f.endswith('.png'))
+    label_counts, written = {}, set()
+    for i, bitmask_file in enumerate(bitmask_files, 1):
+        bitmask = np.array(Image.open(bitmask_dir / bitmask_file))
+        case_id = bitmask_file[:-len('.png')]
+        mask = composite(bitmask, lut)
+        label_path = labels_dir / f"{case_id}{label_writer.file_ending}"
+        label_writer.write(mask, label_path)
+        variant_paths = save_variants(mask, luts, {name: dataset_dir / name / f"{case_id}.png" for name in luts},
+                                      paletted)
+        counts = np.bincount(mask.ravel(), minlength=256)
+        label_counts[case_id] = {str(label): int(counts[label]) for label in np.flatnonzero(counts)}
+        written.update(os.path.abspath(path) for path in (label_path, *variant_paths))
+
+        if i % 50 == 0 or i == len(bitmask_files):
+            print(f"Recomposited {i}/{len(bitmask_files)} label maps")
+
+    if dataset_json is not None:
+        dataset_json['labels'] = dataset_labels(categories, label_priority)
+        tmp_path = dataset_json_path.with_name(dataset_json_path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(dataset_json, f, indent=2)
+        os.replace(tmp_path, dataset_json_path)
+
+    if (dataset_dir / CATALOG_NAME).exists():
+        update_label_counts(dataset_dir, label_counts)
+
+    if records:
+        for case_id, record in records.items():
+            if case_id not in label_counts:
+                continue
+            record['outputs'] = {path: output_stat(path) if os.path.abspath(path) in written else stat
+                                 for path, stat in record.get('outputs', {}).items()}
+            record['label_counts'] = label_counts[case_id]
+            record['settings'] = dict(record.get('settings', {}), label_writer=label_writer.spec,
+                                      label_priority=[list(pair) for pair in label_priority])
+        write_manifest(dataset_dir / MANIFEST_NAME, records)
+    return len(bitmask_files)
+
+def overlap_pixels(bitmask_dir):
+    """Pixel count of every bitmask value over the whole cache, as a (256,) array"""
+    bitmask_dir = Path(bitmask_dir)
+    counts = np.zeros(256, dtype=np.int64)
+    for bitmask_file in sorted(f for f in os.listdir(bitmask_dir) if f.endswith('.png')):
+        counts += np.bincount(np.array(Image.open(bitmask_dir / bitmask_file)).ravel(), minlength=256)
+    return counts
+
+if __name__ == "__main__":
+    dataset_dir = Path("nnunet_dataset")
+    bitmask_dir = dataset_dir / BITMASK_DIR
+
+    bits, records = load_categories(bitmask_dir)
+    names = {record['bit']: record['name'] for record in records}
+    print("Pixels per category combination:")
+    for code, count in enumerate(overlap_pixels(bitmask_dir)):
+        if count and code:
+            combo = " + ".join(names[bit] for bit in range(8) if code >> bit & 1)
+            print(f"  {combo}: {count}")
+
+    # Current mapping: kidney = 1, cyst = 2 with cyst drawn over kidney
+    label_priority = [(2, 1), (1, 2)]
+    recomposite_labels(bitmask_dir, dataset_dir / "labelsTr", label_priority)
@@ -3,25 +3,66 @@
 Check which images have annotations and which don't.
 """
 
-import json
 from pathlib import Path
 
+import numpy as np
+
+from coco_columnar import ColumnarAnnotations
+from coco_stream import scan_coco
+
+def check_geometry(json_path):
+    """
+    Vectorized polygon sanity checks over the whole export: degenerate
+    polygons (fewer than 3 vertices or zero area), vertices outside their
+    image, and the total polygon area per category.
+    """
+    store = ColumnarAnnotations.build(json_path)
+    print(f"\nGeometry of {store.num_polygons} polygons in {store.num_annotations} annotations:")
+    if store.num_polygons == 0:
+        return
+
+    vertex_counts = np.diff(np.asarray(store.poly_offsets))
+    areas = store.polygon_areas()
+    boxes = store.polygon_bboxes()
+
+    # polygon -> annotation -> image
+    poly_ann = np.repeat(np.arange(store.num_annotations), np.diff(np.asarray(store.ann_poly_offsets)))
+    poly_image = np.asarray(store.ann_image_index)[poly_ann]
+    widths = np.asarray(store.image_width)[poly_image]
+    heights = np.asarray(store.image_height)[poly_image]
+
+    too_few = vertex_counts < 3
+    zero_area = ~too_few & (areas == 0)
+    outside = (vertex_counts > 0) & ((boxes[:, 0] < 0) | (boxes[:, 1] < 0) |
+                                     (boxes[:, 2] > widths) | (boxes[:, 3] > heights))
+    print(f"  Polygons with fewer than 3 vertices: {int(too_few.sum())}")
+    print(f"  Polygons with zero area: {int(zero_area.sum())}")
+    print(f"  Polygons reaching outside their image: {int(outside.sum())}")
+    for p in np.flatnonzero(too_few | zero_area | outside)[:10]:
+        image_index = poly_image[p]
+        print(f"    Annotation {int(store.ann_ids[poly_ann[p]])} on {store.meta['file_names'][image_index]}")
+
+    category_names = {cat['id']: cat['name'] for cat in store.meta['categories']}
+    poly_category = np.asarray(store.category_id)[poly_ann]
+    for category_id in np.unique(poly_category):
+        selected = poly_category == category_id
+        print(f"  {category_names.get(int(category_id), category_id)}: {int(selected.sum())} polygons, "
+              f"mean area {areas[selected].mean():.1f} px")
+
 def main():
-    """Check annotation coverage."""
+    """Check annotation coverage and polygon geometry."""
     print("Checking annotation coverage...\n")
+    json_path = "train/_annotations.coco.json"
     
-    # Load COCO data
-    with open("train/_annotations.coco.json", "r") as f:
-        coco_data = json.load(f)
+    # Load COCO data (annotations are streamed and only counted per image)
+    coco_data = scan_coco(json_path)
     
     # Get all images
     all_images = {img['id']: img['file_name'] for img in coco_data['images']}
     print(f"Total images in COCO data: {len(all_images)}")
     
     # Get images with annotations
-    images_with_annotations = set()
-    for ann in coco_data['annotations']:
-        images_with_annotations.add(ann['image_id'])
+    images_with_annotations = set(coco_data['annotation_counts'])
     
     print(f"Images with annotations: {len(images_with_annotations)}")
     
@@ -48,6 +89,8 @@ def main():
             print(f"  ID {img_id}: {filename}")
     else:
         print("\nAll files exist in train folder.")
+    
+    check_geometry(json_path)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,58 +1,45 @@
 import numpy as np
 from PIL import Image
-import json
 
-# Load COCO data to find images with different categories
-with open('train/_annotations.coco.json', 'r') as f:
-    data = json.load(f)
+from case_catalog import CaseCatalog
+from coco_index import CocoIndex
 
 # Find images with cyst (category_id=1) and kidney (category_id=2) annotations
-cyst_images = set()
-kidney_images = set()
-
-for ann in data['annotations']:
-    if ann['category_id'] == 1:  # cyst
-        cyst_images.add(ann['image_id'])
-    elif ann['category_id'] == 2:  # kidney
-        kidney_images.add(ann['image_id'])
+index = CocoIndex.load('train/_annotations.coco.json')
+cyst_images = index.image_ids_with_category(1)  # cyst
+kidney_images = index.image_ids_with_category(2)  # kidney
+catalog = CaseCatalog('nnunet_dataset')
 
 print(f"Images with cyst annotations: {len(cyst_images)}")
 print(f"Images with kidney annotations: {len(kidney_images)}")
 
+def print_masks(image_ids):
+    """Values of the label maps of a few images; images without a case are reported, not fatal"""
+    for img_id in image_ids:
+        case = catalog.case_for_image(img_id)
+        if case is None:
+            print(f"  Image {img_id+1}: no converted case (image dropped or missing)")
+            continue
+        mask_path = case['label_path']
+        try:
+            mask = np.array(Image.open(mask_path))
+            unique_vals = np.unique(mask)
+            print(f"  Image {img_id+1}: unique values = {unique_vals}, non-zero = {np.count_nonzero(mask)}")
+        except Exception as e:
+            print(f"  Error reading {mask_path}: {e}")
+
 # Check a few masks from each category
 print("\nChecking cyst masks:")
-for i, img_id in enumerate(list(cyst_images)[:3]):
-    mask_path = f'nnunet_dataset/labelsTr/case{img_id+1:03d}.png'
-    try:
-        mask = np.array(Image.open(mask_path))
-        unique_vals = np.unique(mask)
-        print(f"  Image {img_id+1}: unique values = {unique_vals}, non-zero = {np.count_nonzero(mask)}")
-    except Exception as e:
-        print(f"  Error reading {mask_path}: {e}")
+print_masks(list(cyst_images)[:3])
 
 print("\nChecking kidney masks:")
-for i, img_id in enumerate(list(kidney_images)[:3]):
-    mask_path = f'nnunet_dataset/labelsTr/case{img_id+1:03d}.png'
-    try:
-        mask = np.array(Image.open(mask_path))
-        unique_vals = np.unique(mask)
-        print(f"  Image {img_id+1}: unique values = {unique_vals}, non-zero = {np.count_nonzero(mask)}")
-    except Exception as e:
-        print(f"  Error reading {mask_path}: {e}")
+print_masks(list(kidney_images)[:3])
 
 # Check if any masks have value 1 (which should be kidney in our mapping)
 print("\nLooking for masks with value 1 (kidney):")
-found_kidney = False
-for case_num in range(1, 21):  # Check first 20 cases
-    mask_path = f'nnunet_dataset/labelsTr/case{case_num:03d}.png'
-    try:
-        mask = np.array(Image.open(mask_path))
-        if 1 in mask:
-            print(f"  Case {case_num:03d}: has value 1 (kidney), unique values = {np.unique(mask)}")
-            found_kidney = True
-            break
-    except:
-        continue
-
-if not found_kidney:
-    print("  No masks found with value 1 in first 20 cases")
\ No newline at end of file
+kidney_cases = catalog.cases_with_label(1)
+if kidney_cases:
+    case = kidney_cases[0]
+    print(f"  {case['case_id']}: has value 1 (kidney), label counts = {catalog.label_counts(case['case_id'])}")
+else:
+    print("  No masks found with value 1")
@@ -1,51 +1,52 @@
-import numpy as np
-from PIL import Image
-import matplotlib.pyplot as plt
+from pathlib import Path
+
+from label_render import DEFAULT_VARIANTS, build_luts, load_class_map, save_variants
+from label_stats import stats_for, value_counts
 
 # Check a few mask files to see why they appear black
+dataset_dir = Path('nnunet_dataset')
 mask_files = ['case001.png', 'case002.png', 'case003.png']
 
+# Visible previews are the labelsTr_visible mirror (0->0, 1->128, 2->255),
+# never extra files inside labelsTr
+preview_name = 'labelsTr_visible'
+preview_luts = build_luts({preview_name: DEFAULT_VARIANTS[preview_name]})
+
 for mask_file in mask_files:
-    mask_path = f'nnunet_dataset/labelsTr/{mask_file}'
-    
+    mask_path = dataset_dir / 'labelsTr' / mask_file
+
     print(f"\n=== Checking {mask_file} ===")
-    
-    # Load mask
-    mask = np.array(Image.open(mask_path))
-    
-    print(f"Shape: {mask.shape}")
-    print(f"Data type: {mask.dtype}")
-    print(f"Min value: {mask.min()}")
-    print(f"Max value: {mask.max()}")
-    print(f"Unique values: {np.unique(mask)}")
-    
-    # Count pixels for each value
-    for val in np.unique(mask):
-        count = np.sum(mask == val)
-        percentage = (count / mask.size) * 100
+
+    # Shape, mode and per-value pixel counts from the label_stats sidecar
+    record = stats_for(mask_path)
+    if record is None:
+        print(f"  Mask not found: {mask_path}")
+        continue
+    counts = value_counts(record)
+    num_pixels = sum(counts.values())
+
+    print(f"Shape: {record['shape']}")
+    print(f"PIL mode: {record['mode']}")
+    print(f"Min value: {min(counts)}")
+    print(f"Max value: {max(counts)}")
+    print(f"Unique values: {sorted(counts)}")
+
+    for val, count in sorted(counts.items()):
+        percentage = (count / num_pixels) * 100
         print(f"  Value {val}: {count} pixels ({percentage:.2f}%)")
-    
-    # Create a visible version by scaling values
-    visible_mask = mask.copy().astype(np.uint8)
-    # Scale values to make them more visible: 0->0, 1->127, 2->255
-    visible_mask[mask == 1] = 127  # Cyst -> gray
-    visible_mask[mask == 2] = 255  # Kidney -> white
-    
-    # Save visible version
-    visible_path = f'nnunet_dataset/labelsTr/{mask_file.replace(".png", "_visible.png")}'
-    Image.fromarray(visible_mask).save(visible_path)
-    print(f"  Saved visible version: {visible_path}")
-    
-    # Also check if the original image has the right format
-    original_img = Image.open(mask_path)
-    print(f"  PIL mode: {original_img.mode}")
-    print(f"  PIL size: {original_img.size}")
+
+    # Render the visible version only if the converter didn't already
+    visible_path = dataset_dir / preview_name / mask_file
+    if not visible_path.exists():
+        visible_path.parent.mkdir(parents=True, exist_ok=True)
+        save_variants(load_class_map(mask_path), preview_luts, {preview_name: visible_path})
+    print(f"  Visible version: {visible_path}")
 
 print("\n=== Summary ===")
 print("The masks appear black because:")
 print("- Background pixels = 0 (black)")
-print("- Cyst pixels = 1 (very dark, almost black)")
-print("- Kidney pixels = 2 (very dark, almost black)")
+print("- Kidney pixels = 1 (very dark, almost black)")
+print("- Cyst pixels = 2 (very dark, almost black)")
 print("\nThis is CORRECT for nnU-Net format!")
 print("nnU-Net expects low integer values (0, 1, 2, ...) not RGB values.")
-print("\nVisible versions have been created with scaled values for verification.")
\ No newline at end of file
+print(f"\nVisible versions are in {dataset_dir / preview_name} for verification.")
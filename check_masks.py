@@ -1,17 +1,19 @@
 import numpy as np
-from PIL import Image
+
+from dataset_reader import DatasetReader
 
 # Check a few mask files
-for case_num in [1, 10, 50]:
-    mask_path = f'nnunet_dataset/labelsTr/case{case_num:03d}.png'
-    try:
-        mask = np.array(Image.open(mask_path))
-        print(f'\nCase {case_num:03d}:')
+# Only the label maps are decoded; works on flat and per-plane datasets alike
+reader = DatasetReader('nnunet_dataset', images=False)
+case_ids = [reader.case_ids[i] for i in (0, 9, 49) if i < len(reader)]
+
+with reader:
+    for case_id, _, mask in reader.iter_cases(case_ids):
+        values, counts = np.unique(mask, return_counts=True)
+        print(f'\n{case_id}:')
         print(f'  Mask shape: {mask.shape}')
-        print(f'  Unique values: {np.unique(mask)}')
+        print(f'  Unique values: {values}')
         print(f'  Non-zero pixels: {np.count_nonzero(mask)}')
         print(f'  Value distribution:')
-        for val in np.unique(mask):
-            print(f'    Value {val}: {np.sum(mask == val)} pixels')
-    except Exception as e:
-        print(f'Error reading {mask_path}: {e}')
\ No newline at end of file
+        for val, count in zip(values, counts):
+            print(f'    Value {val}: {count} pixels')
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Compact columnar annotation store
+Packs every segmentation of a COCO export into flat NumPy arrays instead of
+nested lists of boxed Python floats:
+
+  coords              (V, 2) float32   all polygon vertices, back to back
+  poly_offsets        (P+1,) int64     vertex range of polygon p: [p, p+1)
+  ann_poly_offsets    (A+1,) int64     polygon range of annotation a
+  ann_rle_offsets     (A+1,) int64     RLE run range of annotation a (empty for polygons)
+  rle_counts          (R,)   uint32    uncompressed RLE runs of all RLE annotations
+  ann_ids / ann_image_index / category_id / iscrowd / bbox (A, 4) / area
+  image_ids / image_height / image_width / image_ann_start / image_ann_count
+
+Each array is saved as its own .npy file so the store can be memory-mapped,
+with image file names and categories in a small meta.json alongside.
+"""
+
+import json
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+from coco_rle import decode_counts_string
+from coco_stream import iter_annotation_groups, scan_coco
+
+STORE_VERSION = 1
+
+ARRAY_NAMES = (
+    'coords', 'poly_offsets', 'ann_poly_offsets', 'ann_rle_offsets', 'rle_counts',
+    'ann_ids', 'ann_image_index', 'category_id', 'iscrowd', 'bbox', 'area',
+    'image_ids', 'image_height', 'image_width', 'image_ann_start', 'image_ann_count',
+)
+
+class ColumnarAnnotations:
+    """All segmentations of a COCO export as contiguous arrays plus offsets"""
+
+    def __init__(self, arrays, meta):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+
+    @classmethod
+    def build(cls, json_path):
+        """
+        Build the store from a COCO JSON file by streaming it, so only the
+        compact arrays (never the parsed document) are held in memory.
+        """
+        coco_data = scan_coco(json_path)
+        images = coco_data['images']
+        image_index = {img['id']: i for i, img in enumerate(images)}
+
+        coords = array('f')
+        poly_offsets = array('q', [0])
+        ann_poly_offsets = array('q', [0])
+        ann_rle_offsets = array('q', [0])
+        rle_counts = array('I')
+        ann_ids = array('q')
+        ann_image_index = array('q')
+        category_id = array('i')
+        iscrowd = array('B')
+        bbox = array('f')
+        area = array('f')
+        image_ann_start = np.zeros(len(images), dtype=np.int64)
+        image_ann_count = np.zeros(len(images), dtype=np.int64)
+
+        for img_id, annotations in iter_annotation_groups(json_path, coco_data['annotations_grouped']):
+            if img_id not in image_index:
+                continue
+            i = image_index[img_id]
+            image_ann_start[i] = len(ann_ids)
+            image_ann_count[i] = len(annotations)
+
+            for ann in annotations:
+                segmentation = ann.get('segmentation', [])
+                if isinstance(segmentation, dict):
+                    counts = segmentation['counts']
+                    if isinstance(counts, (str, bytes)):
+                        counts = decode_counts_string(counts)
+                    rle_counts.extend(counts)
+                else:
+                    for polygon in segmentation:
+                        coords.extend(polygon)
+                        poly_offsets.append(len(coords) // 2)
+                ann_poly_offsets.append(len(poly_offsets) - 1)
+                ann_rle_offsets.append(len(rle_counts))
+
+                ann_ids.append(ann.get('id', -1))
+                ann_image_index.append(i)
+                category_id.append(ann.get('category_id', -1))
+                iscrowd.append(ann.get('iscrowd', 0))
+                bbox.extend(ann.get('bbox', [0, 0, 0, 0]))
+                area.append(ann.get('area', 0))
+
+        arrays = {
+            'coords': np.frombuffer(coords, dtype=np.float32).reshape(-1, 2),
+            'poly_offsets': np.frombuffer(poly_offsets, dtype=np.int64),
+            'ann_poly_offsets': np.frombuffer(ann_poly_offsets, dtype=np.int64),
+            'ann_rle_offsets': np.frombuffer(ann_rle_offsets, dtype=np.int64),
+            'rle_counts': np.frombuffer(rle_counts, dtype=np.uint32),
+            'ann_ids': np.frombuffer(ann_ids, dtype=np.int64),
+            'ann_image_index': np.frombuffer(ann_image_index, dtype=np.int64),
+            'category_id': np.frombuffer(category_id, dtype=np.int32),
+            'iscrowd': np.frombuffer(iscrowd, dtype=np.uint8),
+            'bbox': np.frombuffer(bbox, dtype=np.float32).reshape(-1, 4),
+            'area': np.frombuffer(area, dtype=np.float32),
+            'image_ids': np.array([img['id'] for img in images], dtype=np.int64),
+            'image_height': np.array([img['height'] for img in images], dtype=np.int32),
+            'image_width': np.array([img['width'] for img in images], dtype=np.int32),
+            'image_ann_start': image_ann_start,
+            'image_ann_count': image_ann_count,
+        }
+        meta = {
+            'version': STORE_VERSION,
+            'source': str(json_path),
+            'file_names': [img['file_name'] for img in images],
+            'categories': coco_data['categories'],
+        }
+        return cls(arrays, meta)
+
+    def save(self, store_dir):
+        """Write one .npy per array plus meta.json"""
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(store_dir / f"{name}.npy", np.ascontiguousarray(getattr(self, name)))
+        with open(store_dir / "meta.json", 'w') as f:
+            json.dump(self.meta, f)
+
+    @classmethod
+    def load(cls, store_dir, mmap_mode='r'):
+        """Open a saved store; arrays are memory-mapped by default"""
+        store_dir = Path(store_dir)
+        with open(store_dir / "meta.json", 'r') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(store_dir / f"{name}.npy", mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+        return cls(arrays, meta)
+
+    @property
+    def num_images(self):
+        return len(self.image_ids)
+
+    @property
+    def num_annotations(self):
+        return len(self.ann_ids)
+
+    @property
+    def num_polygons(self):
+        return len(self.poly_offsets) - 1
+
+    def annotation_range(self, image_index):
+        """Range of annotation indices belonging to image image_index"""
+        start = int(self.image_ann_start[image_index])
+        return range(start, start + int(self.image_ann_count[image_index]))
+
+    def polygons(self, ann_index):
+        """(n, 2) vertex views of every polygon of one annotation"""
+        first, last = self.ann_poly_offsets[ann_index], self.ann_poly_offsets[ann_index + 1]
+        return [self.coords[self.poly_offsets[p]:self.poly_offsets[p + 1]] for p in range(first, last)]
+
+    def rle(self, ann_index):
+        """Uncompressed COCO RLE dict of an RLE annotation, or None for polygons"""
+        start, end = self.ann_rle_offsets[ann_index], self.ann_rle_offsets[ann_index + 1]
+        if start == end:
+            return None
+        i = self.ann_image_index[ann_index]
+        return {
+            'size': [int(self.image_height[i]), int(self.image_width[i])],
+            'counts': self.rle_counts[start:end].tolist(),
+        }
+
+    def annotations(self, image_index):
+        """COCO-style annotation dicts of one image, e.g. for rasterize_annotations()"""
+        result = []
+        for a in self.annotation_range(image_index):
+            rle = self.rle(a)
+            segmentation = rle if rle is not None else [p.ravel().tolist() for p in self.polygons(a)]
+            result.append({
+                'id': int(self.ann_ids[a]),
+                'image_id': int(self.image_ids[image_index]),
+                'category_id': int(self.category_id[a]),
+                'segmentation': segmentation,
+                'iscrowd': int(self.iscrowd[a]),
+            })
+        return result
+
+    def polygon_areas(self):
+        """Shoelace area of every polygon, computed across the whole store at once"""
+        starts = np.asarray(self.poly_offsets[:-1])
+        ends = np.asarray(self.poly_offsets[1:])
+        areas = np.zeros(self.num_polygons, dtype=np.float64)
+        nonempty = ends > starts
+        if not nonempty.any():
+            return areas
+
+        xy = np.asarray(self.coords, dtype=np.float64)
+        # Index of the next vertex, wrapping around at the end of each polygon
+        nxt = np.arange(len(xy)) + 1
+        nxt[ends[nonempty] - 1] = starts[nonempty]
+        cross = xy[:, 0] * xy[nxt, 1] - xy[nxt, 0] * xy[:, 1]
+        areas[nonempty] = 0.5 * np.abs(np.add.reduceat(cross, starts[nonempty]))
+        return areas
+
+    def annotation_polygon_areas(self):
+        """Sum of polygon areas per annotation (0 for RLE annotations)"""
+        per_polygon = np.concatenate(([0.0], np.cumsum(self.polygon_areas())))
+        offsets = np.asarray(self.ann_poly_offsets)
+        return per_polygon[offsets[1:]] - per_polygon[offsets[:-1]]
+
+    def polygon_bboxes(self):
+        """[x_min, y_min, x_max, y_max] of every non-empty polygon"""
+        starts = np.asarray(self.poly_offsets[:-1])
+        ends = np.asarray(self.poly_offsets[1:])
+        boxes = np.zeros((self.num_polygons, 4), dtype=np.float32)
+        nonempty = ends > starts
+        if nonempty.any():
+            xy = np.asarray(self.coords)
+            boxes[nonempty, :2] = np.minimum.reduceat(xy, starts[nonempty], axis=0)
+            boxes[nonempty, 2:] = np.maximum.reduceat(xy, starts[nonempty], axis=0)
+        return boxes
+
+if __name__ == "__main__":
+    coco_json_path = "train/_annotations.coco.json"
+    store_dir = "train/_annotations.columnar"
+
+    store = ColumnarAnnotations.build(coco_json_path)
+    store.save(store_dir)
+
+    total_bytes = sum(getattr(store, name).nbytes for name in ARRAY_NAMES)
+    print(f"Images: {store.num_images}")
+    print(f"Annotations: {store.num_annotations}")
+    print(f"Polygons: {store.num_polygons}")
+    print(f"Vertices: {len(store.coords)}")
+    print(f"Array memory: {total_bytes / 1024:.1f} KiB")
+    print(f"Saved columnar store to {store_dir}")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Shared indexed COCO dataset model
+Builds every lookup the analysis scripts need in a single streaming pass over
+the COCO JSON and caches the result next to it, so the JSON is parsed once
+and all lookups are O(1) dict/set accesses.
+
+Case IDs are not derived here: the converter assigns them from the case
+registry by default, so look cases up in its catalog
+(CaseCatalog.case_for_image) instead of counting image positions.
+"""
+
+import os
+import pickle
+from pathlib import Path
+
+from coco_stream import iter_coco_items
+
+DEFAULT_COCO_JSON = "train/_annotations.coco.json"
+
+# Bump when the pickled layout changes so stale caches are rebuilt
+INDEX_VERSION = 2
+
+# Indexes already loaded in this process, keyed by resolved JSON path
+_loaded = {}
+
+class CocoIndex:
+    """
+    Indexed view of one COCO export.
+
+    Attributes:
+      images                  image_id -> image record
+      image_ids               image ids in file order
+      categories              category_id -> category record
+      annotations_by_image    image_id -> [annotations]
+      image_ids_by_category   category_id -> {image_id, ...}
+      image_id_by_filename    file_name -> image_id
+    """
+
+    def __init__(self):
+        self.info = {}
+        self.images = {}
+        self.image_ids = []
+        self.categories = {}
+        self.annotations_by_image = {}
+        self.image_ids_by_category = {}
+        self.image_id_by_filename = {}
+        self.num_annotations = 0
+
+    @classmethod
+    def build(cls, json_path):
+        """Build the index in one pass over the COCO file"""
+        index = cls()
+        for key, value in iter_coco_items(json_path):
+            if key == 'images':
+                index.images[value['id']] = value
+                index.image_ids.append(value['id'])
+                index.image_id_by_filename[value['file_name']] = value['id']
+            elif key == 'categories':
+                index.categories[value['id']] = value
+            elif key == 'annotations':
+                img_id = value['image_id']
+                index.annotations_by_image.setdefault(img_id, []).append(value)
+                index.image_ids_by_category.setdefault(value.get('category_id'), set()).add(img_id)
+                index.num_annotations += 1
+            elif key == 'info':
+                index.info = value
+        return index
+
+    @classmethod
+    def load(cls, json_path=DEFAULT_COCO_JSON, use_cache=True):
+        """
+        Return the index for json_path, reusing an in-process copy or the
+        on-disk cache when the JSON file has not changed since it was built.
+        """
+        json_path = Path(json_path).resolve()
+        st = os.stat(json_path)
+        fingerprint = (INDEX_VERSION, st.st_size, st.st_mtime_ns)
+
+        cached = _loaded.get(json_path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        cache_path = cls.cache_path(json_path)
+        index = None
+        if use_cache and cache_path.exists():
+            try:
+                with open(cache_path, 'rb') as f:
+                    stored_fingerprint, stored_index = pickle.load(f)
+                if stored_fingerprint == fingerprint:
+                    index = stored_index
+            except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+                index = None
+
+        if index is None:
+            index = cls.build(json_path)
+            if use_cache:
+                tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+                try:
+                    with open(tmp_path, 'wb') as f:
+                        pickle.dump((fingerprint, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp_path, cache_path)
+                except OSError as e:
+                    print(f"Warning: could not write COCO index cache {cache_path}: {e}")
+
+        _loaded[json_path] = (fingerprint, index)
+        return index
+
+    @staticmethod
+    def cache_path(json_path):
+        """Cache file stored next to the COCO JSON"""
+        json_path = Path(json_path)
+        return json_path.with_name(f".{json_path.name}.index.pickle")
+
+    def annotations_for(self, image_id):
+        return self.annotations_by_image.get(image_id, [])
+
+    def category_name(self, category_id):
+        return self.categories[category_id]['name']
+
+    def image_ids_with_category(self, category_id):
+        return self.image_ids_by_category.get(category_id, set())
+
+    def image_id_for_filename(self, file_name):
+        return self.image_id_by_filename.get(file_name)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+COCO run-length encoding (RLE) codec
+Decodes and encodes COCO RLE masks with NumPy array operations, including the
+compressed string form of `counts`, without depending on pycocotools.
+
+COCO RLE runs alternate background/foreground starting with background and
+walk the mask in column-major (Fortran) order.
+"""
+
+import numpy as np
+
+def decode_counts_string(counts):
+    """
+    Decode a compressed COCO counts string into a list of run lengths.
+
+    Mirrors rleFrString() from the COCO mask API: each count is stored in
+    6-bit characters (offset by 48) holding 5 data bits plus a continuation
+    bit, with sign extension on the last character. From the third count on,
+    values are stored as deltas to the count two positions earlier.
+    """
+    if isinstance(counts, str):
+        counts = counts.encode('ascii')
+    chars = np.frombuffer(counts, dtype=np.uint8).astype(np.int64) - 48
+    if chars.size == 0:
+        return []
+
+    # A character without the continuation bit (0x20) ends a count
+    ends = np.flatnonzero((chars & 0x20) == 0)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+
+    # Position of every character inside its count -> 5-bit shift
+    lengths = ends - starts + 1
+    positions = np.arange(chars.size) - np.repeat(starts, lengths)
+    values = np.add.reduceat((chars & 0x1f) << (5 * positions), starts)
+
+    # Sign extension when the last character of a count has bit 0x10 set
+    negative = (chars[ends] & 0x10) != 0
+    values[negative] -= np.left_shift(1, 5 * lengths[negative])
+
+    # Undo the delta coding: x[m] += x[m-2] for m > 2
+    values[1::2] = np.cumsum(values[1::2])
+    values[2::2] = np.cumsum(values[2::2])
+    return values.tolist()
+
+def encode_counts_string(counts):
+    """Encode run lengths into a compressed COCO counts string (rleToString)"""
+    chars = []
+    for m, count in enumerate(counts):
+        x = int(count)
+        if m > 2:
+            x -= int(counts[m - 2])
+        more = True
+        while more:
+            c = x & 0x1f
+            x >>= 5
+            more = (x != -1) if (c & 0x10) else (x != 0)
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+    return ''.join(chars)
+
+def counts_to_array(counts, height, width):
+    """Expand run lengths into a column-major flat uint8 array of length height*width"""
+    counts = np.asarray(counts, dtype=np.int64)
+    total = height * width
+
+    # Runs alternate 0, 1, 0, 1, ...: repeat each run value by its length
+    values = (np.arange(counts.size) % 2).astype(np.uint8)
+    flat = np.repeat(values, np.maximum(counts, 0))
+    if flat.size < total:
+        flat = np.concatenate((flat, np.zeros(total - flat.size, dtype=np.uint8)))
+    return flat[:total]
+
+def rle_to_mask(segmentation, height=None, width=None):
+    """
+    Decode a COCO RLE segmentation ({'size': [h, w], 'counts': ...}) into a
+    (height, width) uint8 binary mask. Accepts both uncompressed (list) and
+    compressed (string) counts.
+    """
+    if 'size' in segmentation:
+        height, width = segmentation['size']
+
+    counts = segmentation['counts']
+    if isinstance(counts, (str, bytes)):
+        counts = decode_counts_string(counts)
+
+    flat = counts_to_array(counts, height, width)
+    return flat.reshape((height, width), order='F')
+
+def mask_to_rle(mask, compress=False):
+    """
+    Encode a 2D mask (non-zero = foreground) as a COCO RLE dict.
+    Returns uncompressed counts by default, or the compressed string form.
+    """
+    height, width = mask.shape
+    flat = (np.asarray(mask).ravel(order='F') > 0).astype(np.int8)
+
+    # Run boundaries are where the value changes; always start with background
+    changes = np.flatnonzero(np.diff(flat)) + 1
+    boundaries = np.concatenate(([0], changes, [flat.size]))
+    counts = np.diff(boundaries).tolist()
+    if flat.size and flat[0] == 1:
+        counts.insert(0, 0)
+
+    if compress:
+        counts = encode_counts_string(counts)
+    return {'size': [height, width], 'counts': counts}
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Streaming COCO JSON loader
+Walks the top-level arrays of a COCO file ('images', 'categories',
+'annotations', ...) one element at a time instead of json.load()-ing the
+whole document, so very large merged exports can be processed with memory
+proportional to one element (plus whatever the caller keeps).
+"""
+
+import json
+import os
+import re
+import sqlite3
+import tempfile
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+
+class _JsonStream:
+    """Buffered character stream with incremental raw_decode over a text file"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        """Read another chunk, dropping the consumed prefix of the buffer"""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character ('' at end of file)"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed COCO JSON: expected {char!r}, found {found!r} at offset {self.pos}")
+        self.pos += 1
+
+    def decode(self):
+        """Decode the next complete JSON value, reading more input as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # Containers and strings are self-delimiting, but a number can be
+                # cut at a chunk boundary ("2." + "5"), so require some lookahead
+                if self.eof or isinstance(value, (dict, list, str)) or len(self.buf) - end > 32:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+def iter_coco_items(json_path, chunk_size=1 << 20):
+    """
+    Yield (key, value) pairs from a COCO JSON file without loading it whole.
+
+    Top-level arrays are yielded one element at a time, e.g.
+    ('images', {...}), ('images', {...}), ..., ('annotations', {...}).
+    Other top-level values ('info', ...) are yielded once as-is.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f, chunk_size)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+
+        while True:
+            key = stream.decode()
+            stream.expect(':')
+
+            if stream.peek() == '[':
+                stream.pos += 1
+                if stream.peek() == ']':
+                    stream.pos += 1
+                else:
+                    while True:
+                        yield key, stream.decode()
+                        if stream.peek() == ',':
+                            stream.pos += 1
+                            continue
+                        stream.expect(']')
+                        break
+            else:
+                yield key, stream.decode()
+
+            if stream.peek() == ',':
+                stream.pos += 1
+                continue
+            stream.expect('}')
+            break
+
+def iter_coco_section(json_path, section):
+    """Yield the elements of one top-level COCO array (e.g. 'annotations')"""
+    for key, value in iter_coco_items(json_path):
+        if key == section:
+            yield value
+
+def scan_coco(json_path):
+    """
+    Load everything except the annotations in one streaming pass.
+
+    Returns a COCO-like dict with 'images', 'categories', 'licenses', 'info'
+    and, instead of the annotations themselves:
+      num_annotations      total annotation count
+      annotation_counts    image_id -> number of annotations
+      annotations_grouped  True if each image's annotations are contiguous
+    """
+    data = {'images': [], 'categories': [], 'licenses': []}
+    annotation_counts = {}
+    grouped = True
+    last_image_id = None
+
+    for key, value in iter_coco_items(json_path):
+        if key == 'annotations':
+            img_id = value['image_id']
+            if img_id != last_image_id:
+                if img_id in annotation_counts:
+                    grouped = False
+                last_image_id = img_id
+            annotation_counts[img_id] = annotation_counts.get(img_id, 0) + 1
+        elif key in data and isinstance(data[key], list):
+            data[key].append(value)
+        else:
+            data[key] = value
+
+    data['num_annotations'] = sum(annotation_counts.values())
+    data['annotation_counts'] = annotation_counts
+    data['annotations_grouped'] = grouped
+    return data
+
+def iter_annotation_groups(json_path, grouped=None):
+    """
+    Yield (image_id, [annotations]) for every annotated image.
+
+    Roboflow exports list annotations grouped by image, in which case groups
+    are yielded straight off the stream. Otherwise annotations are spilled to
+    a temporary SQLite file and read back one image at a time, so memory
+    stays bounded either way. Pass grouped from scan_coco() to avoid an
+    extra pass over the file.
+    """
+    if grouped is None:
+        grouped = scan_coco(json_path)['annotations_grouped']
+
+    if grouped:
+        current_id, current = None, []
+        for ann in iter_coco_section(json_path, 'annotations'):
+            if current and ann['image_id'] != current_id:
+                yield current_id, current
+                current = []
+            current_id = ann['image_id']
+            current.append(ann)
+        if current:
+            yield current_id, current
+        return
+
+    fd, db_path = tempfile.mkstemp(suffix='.sqlite', prefix='coco_annotations_')
+    os.close(fd)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("CREATE TABLE annotations (seq INTEGER PRIMARY KEY, image_key TEXT, body TEXT)")
+        conn.executemany(
+            "INSERT INTO annotations (image_key, body) VALUES (?, ?)",
+            ((json.dumps(ann['image_id']), json.dumps(ann))
+             for ann in iter_coco_section(json_path, 'annotations')),
+        )
+        conn.execute("CREATE INDEX annotations_by_image ON annotations (image_key, seq)")
+        conn.commit()
+
+        image_keys = [row[0] for row in conn.execute(
+            "SELECT image_key FROM annotations GROUP BY image_key ORDER BY MIN(seq)")]
+        for image_key in image_keys:
+            rows = conn.execute(
+                "SELECT body FROM annotations WHERE image_key = ? ORDER BY seq", (image_key,))
+            yield json.loads(image_key), [json.loads(body) for (body,) in rows]
+    finally:
+        conn.close()
+        os.remove(db_path)
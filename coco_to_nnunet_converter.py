@@ -4,9 +4,16 @@ COCO to nnU-Net v2 Converter
 Converts COCO segmentation format to nnU-Net v2 format for 2D medical image segmentation
 """
 
+import hashlib
+import io
 import json
 import os
+import queue
 import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 try:
     import numpy as np
@@ -16,11 +23,29 @@ except ImportError:
     import numpy as np
 
 try:
-    from PIL import Image
+    from PIL import Image, ImageDraw
 except ImportError:
     print("Installing Pillow...")
     os.system("pip3 install Pillow")
-    from PIL import Image
+    from PIL import Image, ImageDraw
+
+from case_registry import CaseRegistry, positional_case_ids
+from case_catalog import catalog_row, write_catalog
+from category_bitmask import (BITMASK_DIR, category_bits, composite, dataset_labels, draw_polygon,
+                              priority_lut, rasterize_bitmask, save_categories)
+from coco_rle import rle_to_mask
+from coco_stream import iter_annotation_groups, scan_coco
+from conversion_manifest import (ManifestWriter, annotations_sha256,
+                                 is_case_unchanged, output_stat)
+from label_render import DEFAULT_VARIANTS, build_luts, save_variants
+from output_writers import WriterStats, atomic_path, make_writer
+
+# COCO category_id -> nnU-Net label, in drawing order: later entries overwrite
+# earlier ones where they overlap (0=background, 1=kidney, 2=cyst)
+LABEL_PRIORITY = [
+    (2, 1),  # kidney
+    (1, 2),  # cyst
+]
 
 def load_coco_data(json_path):
     """Load and parse COCO JSON file"""
@@ -35,8 +60,10 @@ def examine_coco_structure(data):
     for cat in data.get('categories', []):
         print(f"  - ID: {cat['id']}, Name: {cat['name']}")
     
+    # Streamed data (see coco_stream.scan_coco) only carries annotation counts
+    num_annotations = data.get('num_annotations', len(data.get('annotations', [])))
     print(f"\nImages: {len(data.get('images', []))}")
-    print(f"Annotations: {len(data.get('annotations', []))}")
+    print(f"Annotations: {num_annotations}")
     
     # Check if annotations exist
     if 'annotations' in data and len(data['annotations']) > 0:
@@ -44,57 +71,40 @@ def examine_coco_structure(data):
         print(f"\nSample annotation keys: {list(sample_ann.keys())}")
         if 'segmentation' in sample_ann:
             print(f"Segmentation type: {type(sample_ann['segmentation'])}")
-    else:
+    elif num_annotations == 0:
         print("\nNo annotations found in the dataset!")
     
     return data
 
 def decode_rle_mask(segmentation, height, width):
     """
-    Decode polygon segmentation to binary mask without external dependencies
+    Decode polygon or RLE segmentation to binary mask without external dependencies
     """
-    mask = np.zeros((height, width), dtype=np.uint8)
-    
     if isinstance(segmentation, list):
-        # Handle polygon segmentation
+        # Handle polygon segmentation: every polygon is drawn onto one canvas
+        canvas = Image.new('L', (width, height), 0)
+        draw = ImageDraw.Draw(canvas)
         for polygon in segmentation:
-            if len(polygon) >= 6:  # At least 3 points (x,y pairs)
-                # Convert to PIL polygon format
-                from PIL import Image, ImageDraw
-                img = Image.new('L', (width, height), 0)
-                draw = ImageDraw.Draw(img)
-                
-                # Convert flat list to list of tuples
-                points = [(polygon[i], polygon[i+1]) for i in range(0, len(polygon), 2)]
-                draw.polygon(points, fill=1)
-                
-                # Convert PIL image to numpy array and add to mask
-                polygon_mask = np.array(img)
-                mask = np.maximum(mask, polygon_mask)
-    
-    elif isinstance(segmentation, dict):
-        # Handle RLE format (not expected in this dataset but kept for compatibility)
-        if 'counts' in segmentation:
-            counts = segmentation['counts']
-            if isinstance(counts, str):
-                print("Warning: Compressed RLE format detected. This simple decoder may not work correctly.")
-                return mask
-            else:
-                # Uncompressed RLE
-                pixel_position = 0
-                for i, count in enumerate(counts):
-                    if i % 2 == 1:  # Odd indices are foreground
-                        end_position = pixel_position + count
-                        while pixel_position < end_position and pixel_position < height * width:
-                            row = pixel_position // width
-                            col = pixel_position % width
-                            if row < height and col < width:
-                                mask[row, col] = 1
-                            pixel_position += 1
-                    else:
-                        pixel_position += count
-    
-    return mask
+            draw_polygon(draw, polygon, 1)
+        return np.array(canvas)
+    
+    if isinstance(segmentation, dict) and 'counts' in segmentation:
+        # Handle RLE format, both uncompressed (list) and compressed (string) counts
+        return rle_to_mask(segmentation, height, width)
+    
+    return np.zeros((height, width), dtype=np.uint8)
+
+def rasterize_annotations(annotations, height, width, label_priority=LABEL_PRIORITY):
+    """
+    Rasterize all annotations of one image into a single uint8 label map.
+    
+    Each category is rasterized into its own bit of a category bitmask, which
+    is then composited through a label_priority lookup table, so later labels
+    overwrite earlier ones exactly like compositing one mask per annotation did.
+    """
+    bits = category_bits([{'id': category_id} for category_id, _ in label_priority])
+    bitmask = rasterize_bitmask(annotations, height, width, bits)
+    return composite(bitmask, priority_lut(bits, label_priority))
 
 def create_nnunet_structure(output_dir):
     """Create nnU-Net v2 directory structure"""
@@ -109,12 +119,432 @@ def create_nnunet_structure(output_dir):
     
     return images_dir, labels_dir
 
-def convert_coco_to_nnunet(coco_json_path, images_dir_path, output_dir):
-    """Convert COCO dataset to nnU-Net v2 format"""
+def load_source_image(src_img_path, channel_mode='RGB'):
+    """
+    Open a source image decoded to channel_mode ('RGB' or 'L').
+    
+    For JPEG sources in 'L' mode the decoder is asked for luminance directly
+    (libjpeg's native greyscale output), so no colour image is ever built.
+    """
+    img = Image.open(src_img_path)
+    if channel_mode == 'L' and img.format == 'JPEG':
+        img.draft('L', img.size)
+    if img.mode != channel_mode:
+        img = img.convert(channel_mode)
+    return img
+
+def _reflink(src, dst):
+    """Copy-on-write clone of src at dst (Linux FICLONE); raises OSError if unsupported"""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflink is not supported on this platform")
+    FICLONE = 0x40049409
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.remove(dst)
+            raise
+
+def link_or_copy(src, dst, method='copy'):
+    """
+    Place src's bytes at dst without decoding them.
+    method is 'reflink', 'hardlink' or 'copy'; a failed reflink or hardlink
+    (other filesystem, no support) falls back to a plain copy.
+    Returns the method actually used.
+    """
+    if method == 'hardlink':
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            pass
+    elif method == 'reflink':
+        try:
+            _reflink(src, dst)
+            return 'reflink'
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+    return 'copy'
+
+def read_case(job):
+    """
+    Pipeline stage 1, file I/O: read the source image bytes.
+    Missing and (in incremental mode) unchanged cases are settled here and
+    come back with a 'status'; every other case continues to compute_case.
+    """
+    img_info = job['image_info']
+    result = {
+        'case_id': job['case_id'],
+        'image_id': img_info['id'],
+        'src_img_path': job['src_img_path'],
+        'dst_img_path': job['dst_img_path'],
+        'dst_label_path': job['dst_label_path'],
+    }
+    
+    src_img_path = Path(job['src_img_path'])
+    if not src_img_path.exists():
+        result['status'] = 'missing'
+        return result
+    source = src_img_path.read_bytes()
+    
+    if job.get('incremental'):
+        # Skip cases whose source image, annotations and outputs are unchanged
+        result['source_hash'] = hashlib.sha256(source).hexdigest()
+        result['annotations_hash'] = annotations_sha256(img_info, job['annotations'])
+        previous = job.get('previous')
+        if (is_case_unchanged(previous, result['source_hash'], result['annotations_hash'], job['settings'])
+                and 'label_counts' in previous):
+            result['status'] = 'unchanged'
+            result['outputs'] = previous['outputs']
+            result['label_counts'] = previous['label_counts']
+            return result
+    
+    result['job'] = job
+    result['source'] = source
+    return result
+
+def compute_case(state):
+    """
+    Pipeline stage 2, CPU: decode the source image and rasterize the label map.
+    Nothing is written; the decoded image, bitmask and mask are handed on.
+    """
+    job = state['job']
+    source = state.pop('source')
+    
+    # Sources that already are PNGs in the target mode are passed through as-is
+    channel_mode = job['settings']['channel_mode']
+    passthrough = job['settings']['passthrough']
+    img = Image.open(io.BytesIO(source))
+    if (passthrough and job['image_writer'].file_ending == '.png'
+            and img.format == 'PNG' and img.mode == channel_mode):
+        img.close()
+        state['image'] = None
+    else:
+        img.close()
+        # Decode now so the write stage only encodes
+        img = load_source_image(io.BytesIO(source), channel_mode)
+        img.load()
+        state['image'] = img
+    
+    # Create segmentation mask (all zeros / background if no annotations)
+    # One bit per COCO category, so overlaps survive in the bitmask cache
+    img_info = job['image_info']
+    height, width = img_info['height'], img_info['width']
+    bitmask = rasterize_bitmask(job['annotations'], height, width, job['category_bits'])
+    combined_mask = composite(bitmask, job['label_lut'])
+    counts = np.bincount(combined_mask.ravel(), minlength=256)
+    state['label_counts'] = {str(label): int(counts[label]) for label in np.flatnonzero(counts)}
+    state['bitmask'] = bitmask
+    state['mask'] = combined_mask
+    return state
+
+def write_case(state):
+    """
+    Pipeline stage 3, encode and write: image (or its passthrough link), label
+    map, bitmask and variants. Returns the finished case result.
+    """
+    job = state.pop('job')
+    img = state.pop('image')
+    bitmask = state.pop('bitmask')
+    combined_mask = state.pop('mask')
+    
+    # Outputs are never written through: every writer renames a temporary file
+    # over the old output, which may be a hardlink to a source image or a view
+    dst_img_path = Path(job['dst_img_path'])
+    state['write_stats'] = {}
+    if img is None:
+        if os.path.lexists(dst_img_path):
+            dst_img_path.unlink()
+        state['ingest'] = link_or_copy(job['src_img_path'], dst_img_path, job['settings']['passthrough'])
+    else:
+        # Convert image to the output format
+        state['write_stats']['image'] = job['image_writer'].write(img, dst_img_path)
+        state['ingest'] = 'encode'
+    
+    bitmask_paths = []
+    if job['dst_bitmask_path']:
+        with atomic_path(job['dst_bitmask_path']) as tmp_path:
+            Image.fromarray(bitmask).save(tmp_path, 'PNG')
+        bitmask_paths.append(job['dst_bitmask_path'])
+    
+    # Save mask
+    state['write_stats']['label'] = job['label_writer'].write(combined_mask, job['dst_label_path'])
+    
+    # Render visual variants from the mask already in memory
+    variant_paths = save_variants(combined_mask, job['luts'], job['variant_paths'],
+                                  job['settings']['paletted_variants'])
+    
+    state['status'] = 'converted'
+    state['outputs'] = {str(path): output_stat(path)
+                        for path in (job['dst_img_path'], job['dst_label_path'],
+                                     *variant_paths, *bitmask_paths)}
+    return state
+
+CASE_STAGES = (('read', read_case), ('compute', compute_case), ('write', write_case))
+
+class CaseError(Exception):
+    """
+    A pipeline stage failed on one case. Carries the case and source path,
+    which the original error (decoding from memory, say) doesn't name; only
+    plain arguments, so it survives the trip back from a worker process.
+    """
+
+    def __init__(self, case_id, src_img_path, stage, error):
+        super().__init__(case_id, src_img_path, stage, error)
+        self.case_id = case_id
+        self.src_img_path = src_img_path
+        self.stage = stage
+        self.error = error
+
+    def __str__(self):
+        return f"{self.stage} stage failed for {self.case_id} ({self.src_img_path}): {self.error}"
+
+def run_stage(name, stage, state):
+    """Run one stage on a case, re-raising any error as a CaseError"""
+    try:
+        return stage(state)
+    except Exception as exc:
+        raise CaseError(state.get('case_id'), state.get('src_img_path'), name,
+                        f"{type(exc).__name__}: {exc}") from exc
+
+def convert_case(job):
+    """
+    Convert one COCO image and its annotations into an nnU-Net image/label pair.
+    Runs the pipeline stages back to back, standalone so it can be dispatched
+    to worker processes. A failing stage raises CaseError.
+    """
+    state = job
+    for name, stage in CASE_STAGES:
+        state = run_stage(name, stage, state)
+        if 'status' in state:
+            break
+    return state
+
+def run_case_jobs(jobs, workers=1):
+    """
+    Run convert_case over jobs, serially or across a process pool.
+    
+    Results are yielded in job order. At most a few jobs per worker are in
+    flight at once, so a lazy job iterator is never fully materialized.
+    """
+    if workers <= 1:
+        for job in jobs:
+            yield convert_case(job)
+        return
+    
+    max_in_flight = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(convert_case, job))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+DEFAULT_PIPELINE = {'read': 2, 'compute': os.cpu_count() or 1, 'write': 2}
+
+def run_case_pipeline(jobs, threads=None, queue_size=8, stage_seconds=None):
+    """
+    Run the read -> compute -> write stages of every job as a threaded
+    pipeline. Each stage has its own thread count (threads overrides entries
+    of DEFAULT_PIPELINE) and hands cases to the next through a bounded queue
+    of queue_size, so a slow stage holds back the ones before it instead of
+    letting decoded images pile up in memory. File reads, JPEG decoding and
+    zlib compression release the GIL, so the stages genuinely overlap and
+    throughput approaches that of the slowest stage.
+    
+    Results are yielded as cases finish, not in job order. The first
+    exception raised by any stage stops the pipeline and is re-raised here
+    as a CaseError.
+    If stage_seconds is a dict, the busy time of each stage is added to it.
+    """
+    threads = dict(DEFAULT_PIPELINE, **(threads or {}))
+    stages = [(name, stage, max(int(threads[name]), 1)) for name, stage in CASE_STAGES]
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    done = object()
+    stop = threading.Event()
+    errors = []
+    
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return done
+    
+    def fail(exc):
+        errors.append(exc)
+        stop.set()
+    
+    def feed():
+        try:
+            for job in jobs:
+                if not put(queues[0], job):
+                    return
+        except Exception as exc:
+            fail(exc)
+            return
+        for _ in range(stages[0][2]):
+            put(queues[0], done)
+    
+    def work(k, remaining, lock):
+        name, stage, _ = stages[k]
+        downstream = stages[k + 1][2] if k + 1 < len(stages) else 1
+        busy = 0.0
+        try:
+            while True:
+                state = get(queues[k])
+                if state is done:
+                    break
+                if 'status' not in state:
+                    start = time.perf_counter()
+                    state = run_stage(name, stage, state)
+                    busy += time.perf_counter() - start
+                if not put(queues[k + 1], state):
+                    break
+        except Exception as exc:
+            fail(exc)
+        with lock:
+            if stage_seconds is not None:
+                stage_seconds[name] = stage_seconds.get(name, 0.0) + busy
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        # The last thread of a stage tells every thread of the next one to finish
+        if last:
+            for _ in range(downstream):
+                put(queues[k + 1], done)
+    
+    workers = [threading.Thread(target=feed, name='case-feed', daemon=True)]
+    for k, (name, _, count) in enumerate(stages):
+        remaining, lock = [count], threading.Lock()
+        workers += [threading.Thread(target=work, args=(k, remaining, lock), name=f'case-{name}-{i}', daemon=True)
+                    for i in range(count)]
+    for worker in workers:
+        worker.start()
+    try:
+        while True:
+            result = get(queues[-1])
+            if result is done:
+                break
+            yield result
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+    if errors:
+        raise errors[0]
+
+def convert_coco_to_nnunet(coco_json_path, images_dir_path, output_dir, workers=1, incremental=False,
+                           stream=False, channel_mode='RGB', passthrough='copy',
+                           image_writer=None, label_writer=None, variants=None,
+                           paletted_variants=False, label_priority=LABEL_PRIORITY,
+                           keep_bitmasks=False, case_ids='positional', pipeline=None):
+    """
+    Convert COCO dataset to nnU-Net v2 format
+    
+    workers > 1 spreads the per-image work (decode, rasterize, PNG encode)
+    across that many processes; dataset.json is written once all are done.
+    
+    incremental=True records every finished case in a manifest in output_dir
+    and skips cases whose source image and annotations are unchanged since
+    the last run, which also resumes an interrupted run.
+    
+    stream=True walks the COCO file incrementally and hands each image's
+    annotation group to the workers without holding all annotations in memory.
+    
+    channel_mode selects the PIL mode of the written images: 'RGB' (default)
+    or 'L' for single-channel greyscale decoded straight from the JPEG, which
+    replaces the separate convert_to_greyscale.py pass.
+    
+    passthrough controls sources that already are PNGs in channel_mode: their
+    bytes are placed in imagesTr by 'copy' (default), 'reflink' or 'hardlink'
+    instead of being decoded and re-encoded. None always re-encodes.
+    
+    image_writer / label_writer choose the output format, as writer objects or
+    spec strings from output_writers ('png', 'png:level=9,strategy=rle', 'npy',
+    'npz'). Both must share a file ending, which goes into dataset.json.
+    Bytes written and write throughput are reported per writer.
+    
+    variants maps an output directory name to a label_render variant config
+    (e.g. label_render.DEFAULT_VARIANTS for labelsTr_visible/labelsTr_colored).
+    Each variant is rendered as PNG from the in-memory mask through a lookup
+    table, so no label map has to be decoded again afterwards. With
+    paletted_variants=True they are written as palette-mode PNGs that keep the
+    class indices as pixels and carry the colours only in the palette.
+    
+    label_priority is [(category_id, label), ...] in draw order. With
+    keep_bitmasks=True the per-case category bitmasks are cached under
+    <output_dir>/bitmasksTr, so other priorities or label ids can later be
+    produced with category_bitmask.recomposite_labels() instead of a rerun.
+    
+    case_ids='positional' numbers cases by their position in the COCO image
+    list. 'registry' (or 'registry:sha256') takes them from the persistent
+    case_registry in output_dir, so existing cases keep their IDs when images
+    are added or removed and a new export only adds files. In incremental
+    mode the outputs of cases no longer in the export are deleted.
+    
+    pipeline runs the cases in one process as a threaded read -> compute ->
+    write pipeline instead of a process pool: a dict of per-stage thread
+    counts such as {'read': 2, 'compute': 4, 'write': 2} (missing stages use
+    DEFAULT_PIPELINE). The busy time of every stage is reported afterwards,
+    which shows which one to give more threads. Can't be combined with
+    workers > 1.
+    """
+    if channel_mode not in ('RGB', 'L'):
+        raise ValueError(f"Unsupported channel_mode: {channel_mode}")
+    if passthrough not in (None, 'copy', 'reflink', 'hardlink'):
+        raise ValueError(f"Unsupported passthrough: {passthrough}")
+    if case_ids not in ('positional', 'registry', 'registry:sha256'):
+        raise ValueError(f"Unsupported case_ids: {case_ids}")
+    if pipeline is not None:
+        if workers > 1:
+            raise ValueError("pipeline runs in one process; use either workers > 1 or pipeline")
+        unknown = set(pipeline) - set(DEFAULT_PIPELINE)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {sorted(unknown)}")
+    image_writer = make_writer(image_writer)
+    label_writer = make_writer(label_writer)
+    if image_writer.file_ending != label_writer.file_ending:
+        raise ValueError(f"Image and label writers must share a file ending "
+                         f"({image_writer.file_ending} vs {label_writer.file_ending})")
+    file_ending = label_writer.file_ending
+    
+    # Options that change the written files; recorded in the manifest
+    settings = {
+        'channel_mode': channel_mode,
+        'passthrough': passthrough,
+        'image_writer': image_writer.spec,
+        'label_writer': label_writer.spec,
+        # JSON round trip so the integer class keys compare equal to the manifest's
+        'variants': json.loads(json.dumps(variants or {})),
+        'paletted_variants': paletted_variants,
+        'label_priority': [list(pair) for pair in label_priority],
+        'keep_bitmasks': keep_bitmasks,
+    }
+    luts = build_luts(variants or {})
     
     # Load COCO data
     print("Loading COCO data...")
-    coco_data = load_coco_data(coco_json_path)
+    if stream:
+        # Everything but the annotations, which are streamed per image below
+        coco_data = scan_coco(coco_json_path)
+    else:
+        coco_data = load_coco_data(coco_json_path)
     
     # Examine structure
     examine_coco_structure(coco_data)
@@ -122,6 +552,20 @@ def convert_coco_to_nnunet(coco_json_path, images_dir_path, output_dir):
     # Create output structure
     print("\nCreating nnU-Net v2 directory structure...")
     images_out_dir, labels_out_dir = create_nnunet_structure(output_dir)
+    for name in luts:
+        (Path(output_dir) / name).mkdir(parents=True, exist_ok=True)
+    # Cached bitmasks keep every category so any priority can be recomposited
+    # later, which caps them at 8 categories. Otherwise only the categories
+    # that end up in the label map need a bit.
+    if keep_bitmasks:
+        bits = category_bits(coco_data['categories'])
+    else:
+        bits = category_bits([{'id': category_id} for category_id, _ in label_priority])
+    label_lut = priority_lut(bits, label_priority)
+    bitmask_dir = Path(output_dir) / BITMASK_DIR
+    if keep_bitmasks:
+        bitmask_dir.mkdir(parents=True, exist_ok=True)
+        save_categories(bitmask_dir, coco_data['categories'])
     
     # Create mappings
     image_id_to_info = {img['id']: img for img in coco_data['images']}
@@ -131,103 +575,158 @@ def convert_coco_to_nnunet(coco_json_path, images_dir_path, output_dir):
     
     # Process images and annotations
     processed_images = set()
+    catalog_rows = []
     
-    if 'annotations' not in coco_data or len(coco_data['annotations']) == 0:
+    if not coco_data.get('num_annotations', len(coco_data.get('annotations', []))):
         print("\nNo annotations found! Converting images only...")
-        # Convert images without annotations
-        for i, img_info in enumerate(coco_data['images']):
-            case_id = f"case{i+1:03d}"
-            
-            # Copy and rename image
-            src_img_path = Path(images_dir_path) / img_info['file_name']
-            dst_img_path = images_out_dir / f"{case_id}_0000.png"
-            
-            if src_img_path.exists():
-                # Convert to PNG if needed
-                img = Image.open(src_img_path)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
-                img.save(dst_img_path, 'PNG')
-                
-                # Create empty mask
-                mask = np.zeros((img_info['height'], img_info['width']), dtype=np.uint8)
-                mask_img = Image.fromarray(mask)
-                mask_img.save(labels_out_dir / f"{case_id}.png", 'PNG')
-                
-                processed_images.add(img_info['id'])
+    
+    if stream:
+        num_annotated = len(coco_data['annotation_counts'])
     else:
         # Group annotations by image
         annotations_by_image = {}
-        for ann in coco_data['annotations']:
+        for ann in coco_data.get('annotations', []):
             img_id = ann['image_id']
             if img_id not in annotations_by_image:
                 annotations_by_image[img_id] = []
             annotations_by_image[img_id].append(ann)
+        num_annotated = len(annotations_by_image)
+    
+    print(f"\nProcessing {len(coco_data['images'])} images (including {num_annotated} with annotations)...")
+    if workers > 1:
+        print(f"Using {workers} worker processes")
+    if pipeline is not None:
+        threads = dict(DEFAULT_PIPELINE, **pipeline)
+        print("Using a threaded pipeline: " + ", ".join(f"{threads[name]} {name}" for name, _ in CASE_STAGES))
+    
+    manifest = ManifestWriter(output_dir) if incremental else None
+    if manifest is not None:
+        print(f"Incremental mode: {len(manifest.records)} cases in manifest")
+    
+    # Case IDs are fixed up front, by position or from the registry
+    if case_ids == 'positional':
+        image_case_ids = positional_case_ids(coco_data['images'])
+    else:
+        identity = case_ids.partition(':')[2] or 'file_name'
+        registry = CaseRegistry.load(output_dir, identity)
+        image_case_ids = registry.assign(coco_data['images'], images_dir_path)
+        registry.save()
+        print(f"Case registry: {len(registry.cases)} registered sources, next case number {registry.next_number}")
+    
+    def make_job(i, img_info, annotations):
+        case_id = image_case_ids[i]
+        return {
+            'case_id': case_id,
+            'image_info': img_info,
+            'annotations': annotations,
+            'src_img_path': str(Path(images_dir_path) / img_info['file_name']),
+            'dst_img_path': str(images_out_dir / f"{case_id}_0000{file_ending}"),
+            'dst_label_path': str(labels_out_dir / f"{case_id}{file_ending}"),
+            'settings': settings,
+            'image_writer': image_writer,
+            'label_writer': label_writer,
+            'luts': luts,
+            'category_bits': bits,
+            'label_lut': label_lut,
+            'dst_bitmask_path': str(bitmask_dir / f"{case_id}.png") if keep_bitmasks else None,
+            'variant_paths': {name: str(Path(output_dir) / name / f"{case_id}.png") for name in luts},
+            'incremental': incremental,
+            'previous': manifest.records.get(case_id) if manifest is not None else None,
+        }
+    
+    # Process ALL images, not just those with annotations. Case IDs were fixed
+    # above, so they don't depend on which worker finishes first.
+    def iter_jobs():
+        if not stream:
+            for i, img_info in enumerate(coco_data['images']):
+                yield make_job(i, img_info, annotations_by_image.get(img_info['id'], []))  # Empty list if no annotations
+            return
         
-        print(f"\nProcessing {len(coco_data['images'])} images (including {len(annotations_by_image)} with annotations)...")
-        
-        # Process ALL images, not just those with annotations
+        # Streaming: annotated images as their annotation groups arrive, then the rest
+        image_index = {img['id']: i for i, img in enumerate(coco_data['images'])}
+        seen = set()
+        for img_id, annotations in iter_annotation_groups(coco_json_path, coco_data['annotations_grouped']):
+            if img_id in image_index:
+                seen.add(img_id)
+                i = image_index[img_id]
+                yield make_job(i, coco_data['images'][i], annotations)
         for i, img_info in enumerate(coco_data['images']):
-            img_id = img_info['id']
-            case_id = f"case{i+1:03d}"
-            annotations = annotations_by_image.get(img_id, [])  # Empty list if no annotations
-            
-            # Copy and rename image
-            src_img_path = Path(images_dir_path) / img_info['file_name']
-            dst_img_path = images_out_dir / f"{case_id}_0000.png"
-            
-            if not src_img_path.exists():
-                print(f"Warning: Image {src_img_path} not found")
+            if img_info['id'] not in seen:
+                yield make_job(i, img_info, [])
+    
+    stage_seconds = {}
+    if pipeline is not None:
+        results = run_case_pipeline(iter_jobs(), pipeline, stage_seconds=stage_seconds)
+    else:
+        results = run_case_jobs(iter_jobs(), workers)
+    
+    unchanged_cases = 0
+    ingest_counts = {}
+    writer_stats = {'image': WriterStats(image_writer.spec), 'label': WriterStats(label_writer.spec)}
+    completed = False
+    try:
+        for result in results:
+            if result['status'] == 'missing':
+                print(f"Warning: Image {result['src_img_path']} not found")
                 continue
+            processed_images.add(result['image_id'])
+            catalog_rows.append(catalog_row(result['case_id'], image_id_to_info[result['image_id']],
+                                            result['dst_img_path'], result['dst_label_path'],
+                                            result['label_counts']))
             
-            # Convert image to PNG
-            img = Image.open(src_img_path)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            img.save(dst_img_path, 'PNG')
-            
-            # Create segmentation mask
-            height, width = img_info['height'], img_info['width']
-            combined_mask = np.zeros((height, width), dtype=np.uint8)
-            
-            # Only process annotations if they exist
-            if annotations:
-                # Group annotations by category
-                kidney_annotations = [ann for ann in annotations if ann.get('category_id') == 2]
-                cyst_annotations = [ann for ann in annotations if ann.get('category_id') == 1]
-                
-                # First process kidney annotations (value 1)
-                for ann in kidney_annotations:
-                    if 'segmentation' in ann:
-                        mask = decode_rle_mask(ann['segmentation'], height, width)
-                        combined_mask[mask > 0] = 1  # kidney = 1
-                
-                # Then process cyst annotations (value 2, overwrites kidney where they overlap)
-                for ann in cyst_annotations:
-                    if 'segmentation' in ann:
-                        mask = decode_rle_mask(ann['segmentation'], height, width)
-                        combined_mask[mask > 0] = 2  # cyst = 2
-            # If no annotations, combined_mask remains all zeros (background)
-            
-            # Save mask as PNG
-            mask_img = Image.fromarray(combined_mask)
-            mask_img.save(labels_out_dir / f"{case_id}.png", 'PNG')
+            if result['status'] == 'unchanged':
+                unchanged_cases += 1
+                continue
             
-            processed_images.add(img_id)
+            ingest_counts[result['ingest']] = ingest_counts.get(result['ingest'], 0) + 1
+            for role, (nbytes, seconds) in result['write_stats'].items():
+                writer_stats[role].add(nbytes, seconds)
+            if manifest is not None:
+                manifest.record({
+                    'case_id': result['case_id'],
+                    'image_id': result['image_id'],
+                    'source_hash': result['source_hash'],
+                    'annotations_hash': result['annotations_hash'],
+                    'settings': settings,
+                    'outputs': result['outputs'],
+                    'label_counts': result['label_counts'],
+                })
+        completed = True
+    finally:
+        # Stops the pipeline threads or worker processes if the loop was left early
+        results.close()
+        if manifest is not None:
+            # Only prune stale cases once the whole dataset has been seen
+            keep = set(image_case_ids) if completed else None
+            dropped = manifest.close(keep_case_ids=keep)
+            for record in dropped.values():
+                for path in record.get('outputs', {}):
+                    if os.path.lexists(path):
+                        os.unlink(path)
+            if dropped:
+                print(f"Removed outputs of {len(dropped)} cases no longer in the export")
+    
+    if manifest is not None:
+        print(f"Skipped {unchanged_cases} unchanged cases")
+    passed_through = {k: v for k, v in ingest_counts.items() if k != 'encode'}
+    if passed_through:
+        print(f"Images passed through without re-encoding: {passed_through}")
+    for role, stats in writer_stats.items():
+        if stats.files:
+            print(f"{role.capitalize()} writer {stats.summary()}")
+    if stage_seconds:
+        print("Pipeline stage busy time: " + ", ".join(
+            f"{name} {stage_seconds.get(name, 0.0):.1f}s" for name, _ in CASE_STAGES))
     
     # Create dataset.json for nnU-Net v2
-    # Updated mapping: 0=background, 1=kidney, 2=cyst
+    # Labels follow label_priority (by default 0=background, 1=kidney, 2=cyst)
     dataset_json = {
         "channel_names": {
             "0": "image"
         },
-        "labels": {
-            "background": 0,
-            "kidney": 1,
-            "cyst": 2
-        },
+        "labels": dataset_labels(coco_data['categories'], label_priority),
         "numTraining": len(processed_images),
-        "file_ending": ".png",
+        "file_ending": file_ending,
         "dataset_name": "KidneyCyst",
         "reference": "Converted from COCO format",
         "description": "Kidney cyst segmentation dataset"
@@ -237,12 +736,20 @@ def convert_coco_to_nnunet(coco_json_path, images_dir_path, output_dir):
     with open(Path(output_dir) / "dataset.json", 'w') as f:
         json.dump(dataset_json, f, indent=2)
     
+    # Case lookup table for the reconciliation scripts
+    catalog_path = write_catalog(output_dir, sorted(catalog_rows, key=lambda row: row['case_id']))
+    
     print(f"\n=== Conversion Complete ===")
     print(f"Processed images: {len(processed_images)}")
     print(f"Output directory: {output_dir}")
     print(f"Images directory: {images_out_dir}")
     print(f"Labels directory: {labels_out_dir}")
+    for name in luts:
+        print(f"Variant directory: {Path(output_dir) / name}")
+    if keep_bitmasks:
+        print(f"Bitmask directory: {bitmask_dir}")
     print(f"Dataset JSON: {Path(output_dir) / 'dataset.json'}")
+    print(f"Case catalog: {catalog_path}")
     
     return len(processed_images)
 
@@ -251,10 +758,21 @@ if __name__ == "__main__":
     coco_json_path = "/Users/carlmacabales/Downloads/Kidney Cyst Coco Segmentation/train/_annotations.coco.json"
     images_dir_path = "/Users/carlmacabales/Downloads/Kidney Cyst Coco Segmentation/train"
     output_dir = "/Users/carlmacabales/Downloads/Kidney Cyst Coco Segmentation/nnunet_dataset"
+    workers = os.cpu_count() or 1
+    incremental = True
+    paletted_variants = False
+    keep_bitmasks = True
+    case_ids = 'registry'  # First run numbers cases exactly like 'positional'
+    pipeline = None  # e.g. {'read': 2, 'compute': 4, 'write': 2} with workers = 1
     
     # Run conversion
     try:
-        num_processed = convert_coco_to_nnunet(coco_json_path, images_dir_path, output_dir)
+        num_processed = convert_coco_to_nnunet(coco_json_path, images_dir_path, output_dir,
+                                               workers=workers, incremental=incremental,
+                                               variants=DEFAULT_VARIANTS,
+                                               paletted_variants=paletted_variants,
+                                               keep_bitmasks=keep_bitmasks,
+                                               case_ids=case_ids, pipeline=pipeline)
         print(f"\nSuccessfully converted {num_processed} images to nnU-Net v2 format!")
     except Exception as e:
         print(f"Error during conversion: {e}")
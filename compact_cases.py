@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Remove cases and compact case numbering across all mirrored trees
+imagesTr, labelsTr, labelsTr_visible, labelsTr_colored and bitmasksTr hold
+one file per case, either flat or split into per-plane subfolders (Axial,
+Coronal). compact_dataset() removes a set of cases from every tree and
+renumbers the remaining cases of each folder to case001, case002, ... in
+their current order.
+
+Nothing is copied. The full plan (deletes, plus a rename of every moving
+file to a temporary name and from there to its final name) is written to a
+journal before any file is touched, and the journal records when the first
+rename phase is complete. If the process dies part-way, running
+compact_dataset() (or resume()) again rolls the journal forward: every step
+checks the file system before acting, so steps already done are skipped.
+
+The converter's case catalog and conversion manifest refer to cases by ID
+and path. Updated copies of both are staged next to them before the journal
+is written and swapped in together with the final renames, so after a
+completed (or resumed) compaction they describe the files that are actually
+there. dataset.json is staged the same way with numTraining recounted from
+the pairs that remain. A dataset managed by the case registry promises IDs that never shift,
+so compact_dataset() refuses to renumber it; removing cases with
+renumber=False is still allowed.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+from case_catalog import CATALOG_NAME, remap_catalog
+from case_registry import REGISTRY_NAME
+from conversion_manifest import MANIFEST_NAME, remap_manifest
+from dataset_reader import find_cases
+
+TREES = ('imagesTr', 'labelsTr', 'labelsTr_visible', 'labelsTr_colored', 'bitmasksTr')
+JOURNAL_NAME = ".compact_journal.json"
+
+# Sidecars keyed by file name that a renumber makes stale
+STALE_SIDECARS = ('.label_stats.json',)
+
+CASE_FILE = re.compile(r'^case(\d+)(_\d{4})?(\.[A-Za-z0-9.]+)$')
+
+def _case_files(dir_path):
+    """case number -> [(file name, channel suffix, extension)] of one folder"""
+    cases = {}
+    for name in os.listdir(dir_path):
+        match = CASE_FILE.match(name)
+        if match and os.path.isfile(os.path.join(dir_path, name)):
+            number = int(match.group(1))
+            cases.setdefault(number, []).append((name, match.group(2) or '', match.group(3)))
+    return cases
+
+def _groups(dataset_dir):
+    """
+    Folder groups that share one case numbering: the dataset root ('') for
+    flat layouts plus each plane subfolder. Returns {group: [dir, ...]}.
+    """
+    dataset_dir = Path(dataset_dir)
+    groups = {}
+    for tree in TREES:
+        tree_dir = dataset_dir / tree
+        if not tree_dir.is_dir():
+            continue
+        groups.setdefault('', []).append(tree_dir)
+        for entry in sorted(tree_dir.iterdir()):
+            if entry.is_dir():
+                groups.setdefault(entry.name, []).append(entry)
+    return groups
+
+def _matches(case_id, group, remove):
+    return case_id in remove or (group and f"{group}/{case_id}" in remove)
+
+def plan_compaction(dataset_dir, remove=(), renumber=True):
+    """
+    Build the plan without touching any file. remove holds case ids
+    ('case012', removed from every folder) or 'Plane/case012' for one plane
+    only. Returns {'deletes': [path], 'renames': [{'src', 'tmp', 'dst'}],
+    'num_training': image/label pairs left afterwards,
+    'token': name prefix of the temporary files}.
+    """
+    remove = set(remove)
+    deletes, renames = [], []
+    token = os.urandom(4).hex()
+
+    for group, dirs in _groups(dataset_dir).items():
+        files_by_dir = {d: _case_files(d) for d in dirs}
+        numbers = sorted({n for cases in files_by_dir.values() for n in cases})
+        kept = [n for n in numbers if not _matches(f"case{n:03d}", group, remove)]
+        new_number = {n: i for i, n in enumerate(kept, 1)} if renumber else {n: n for n in kept}
+
+        for d, cases in files_by_dir.items():
+            for number, files in cases.items():
+                for name, channel, ext in files:
+                    src = str(d / name)
+                    if number not in new_number:
+                        deletes.append(src)
+                    elif new_number[number] != number or name != f"case{number:03d}{channel}{ext}":
+                        dst_name = f"case{new_number[number]:03d}{channel}{ext}"
+                        renames.append({'src': src, 'tmp': str(d / f".compact-{token}-{dst_name}"),
+                                        'dst': str(d / dst_name)})
+
+    # Every destination must be free once the moving files are out of the way
+    moving = {op['src'] for op in renames} | set(deletes)
+    for op in renames:
+        if os.path.exists(op['dst']) and op['dst'] not in moving:
+            raise FileExistsError(f"Rename target already exists and is not being moved: {op['dst']}")
+
+    # Renames keep a pair together, so only deletes change the pair count
+    deleted = set(deletes)
+    num_training = sum(1 for _, image_path, label_path in find_cases(dataset_dir)
+                       if image_path not in deleted and label_path not in deleted)
+    return {'deletes': deletes, 'renames': renames, 'num_training': num_training, 'token': token}
+
+def _stage_metadata(dataset_dir, plan):
+    """
+    Write updated copies of the catalog, manifest and dataset.json under
+    temporary names. Returns [{'tmp', 'dst'}] to be swapped in with the
+    final renames.
+    """
+    moved = {os.path.abspath(path): None for path in plan['deletes']}
+    moved.update({os.path.abspath(op['src']): os.path.abspath(op['dst']) for op in plan['renames']})
+
+    def rename(path):
+        new_path = moved.get(os.path.abspath(path), os.path.abspath(path))
+        # Keep the stored path style (relative or absolute)
+        return new_path and os.path.join(os.path.dirname(path), os.path.basename(new_path))
+
+    staged = []
+    for name, remap in ((CATALOG_NAME, remap_catalog), (MANIFEST_NAME, remap_manifest)):
+        path = Path(dataset_dir) / name
+        if path.exists():
+            tmp_path = path.with_name(f".compact-{plan['token']}-{name}")
+            remap(path, tmp_path, rename)
+            staged.append({'tmp': str(tmp_path), 'dst': str(path)})
+
+    dataset_json_path = Path(dataset_dir) / 'dataset.json'
+    if dataset_json_path.exists():
+        with open(dataset_json_path, 'r') as f:
+            dataset_json = json.load(f)
+        dataset_json['numTraining'] = plan['num_training']
+        tmp_path = dataset_json_path.with_name(f".compact-{plan['token']}-dataset.json")
+        with open(tmp_path, 'w') as f:
+            json.dump(dataset_json, f, indent=2)
+        staged.append({'tmp': str(tmp_path), 'dst': str(dataset_json_path)})
+    return staged
+
+def _write_journal(journal_path, journal):
+    tmp_path = journal_path.with_name(journal_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(journal, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, journal_path)
+
+def _roll_forward(dataset_dir, journal):
+    """Carry out a journaled plan; safe to repeat after a crash at any point"""
+    journal_path = Path(dataset_dir) / JOURNAL_NAME
+
+    if journal['phase'] == 'planned':
+        for path in journal['deletes']:
+            if os.path.lexists(path):
+                os.unlink(path)
+        # Phase 1: every moving file to its unique temporary name
+        for op in journal['renames']:
+            if os.path.lexists(op['src']) and not os.path.lexists(op['tmp']):
+                os.rename(op['src'], op['tmp'])
+        journal['phase'] = 'staged'
+        _write_journal(journal_path, journal)
+
+    # Phase 2: temporary names to final names, metadata included
+    for op in journal['renames'] + journal.get('metadata', []):
+        if os.path.lexists(op['tmp']):
+            os.rename(op['tmp'], op['dst'])
+
+    touched_dirs = {os.path.dirname(p) for p in journal['deletes']}
+    touched_dirs |= {os.path.dirname(op['dst']) for op in journal['renames']}
+    for dir_path in touched_dirs:
+        for sidecar in STALE_SIDECARS:
+            sidecar_path = os.path.join(dir_path, sidecar)
+            if os.path.exists(sidecar_path):
+                os.unlink(sidecar_path)
+
+    os.unlink(journal_path)
+
+def resume(dataset_dir):
+    """Finish an interrupted compaction. Returns False if there was none."""
+    journal_path = Path(dataset_dir) / JOURNAL_NAME
+    if not journal_path.exists():
+        return False
+    with open(journal_path, 'r') as f:
+        journal = json.load(f)
+    print(f"Resuming interrupted compaction ({journal['phase']})...")
+    _roll_forward(dataset_dir, journal)
+    return True
+
+def compact_dataset(dataset_dir='nnunet_dataset', remove=(), renumber=True, dry_run=False):
+    """
+    Remove cases and (with renumber=True) compact numbering in every tree.
+    An interrupted earlier run is finished first. Returns the plan.
+    Raises ValueError for renumber=True on a dataset with a case registry.
+    """
+    resume(dataset_dir)
+    if renumber and (Path(dataset_dir) / REGISTRY_NAME).exists():
+        raise ValueError(f"{dataset_dir} assigns case IDs from {REGISTRY_NAME}, which never shift; "
+                         "use renumber=False to only remove cases")
+    plan = plan_compaction(dataset_dir, remove, renumber)
+    print(f"Plan: {len(plan['deletes'])} files to delete, {len(plan['renames'])} files to rename, "
+          f"{plan['num_training']} pairs left")
+    if dry_run or not (plan['deletes'] or plan['renames']):
+        return plan
+
+    journal = dict(plan, phase='planned', metadata=_stage_metadata(dataset_dir, plan))
+    _write_journal(Path(dataset_dir) / JOURNAL_NAME, journal)
+    _roll_forward(dataset_dir, journal)
+    print("Compaction complete")
+    return plan
+
+if __name__ == "__main__":
+    # Renumber every tree (flat and per-plane) without removing anything
+    compact_dataset('nnunet_dataset')
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Per-case conversion manifest for incremental, resumable COCO -> nnU-Net runs.
+
+The manifest lives in the output directory as JSON lines, one record per
+converted case, appended as soon as the case finishes. Each record holds the
+hash of the source image, the hash of that image's annotations and the
+size/mtime of every output file, so a rerun can skip cases whose inputs and
+outputs are unchanged and an interrupted run picks up where it stopped.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+MANIFEST_NAME = "conversion_manifest.jsonl"
+
+CASE_ID = re.compile(r'case\d+')
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Hash a file's bytes in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def annotations_sha256(img_info, annotations):
+    """Hash the parts of an image record and its annotations that affect the label map"""
+    payload = {
+        'height': img_info['height'],
+        'width': img_info['width'],
+        'annotations': annotations,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def output_stat(path):
+    """Return [size, mtime_ns] for an output file"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def outputs_intact(outputs):
+    """Check that every recorded output file still exists untouched"""
+    for path, recorded in outputs.items():
+        try:
+            if output_stat(path) != recorded:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+def is_case_unchanged(previous, source_hash, annotations_hash, settings=None):
+    """
+    True when a manifest record matches the current inputs and conversion
+    settings, and its outputs are intact
+    """
+    return (
+        previous is not None
+        and previous.get('source_hash') == source_hash
+        and previous.get('annotations_hash') == annotations_hash
+        and previous.get('settings', {}) == (settings or {})
+        and outputs_intact(previous.get('outputs', {}))
+    )
+
+def load_manifest(output_dir):
+    """
+    Load manifest records keyed by case_id. Later records win, and a
+    truncated final line from an interrupted run is ignored.
+    """
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    records = {}
+    if not manifest_path.exists():
+        return records
+
+    with open(manifest_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record['case_id']] = record
+    return records
+
+def remap_manifest(src_path, dst_path, rename):
+    """
+    Write a copy of the manifest at src_path to dst_path with its output
+    paths moved by rename(path) -> new path, or None for a deleted file.
+    Records that lose an output are dropped; a record whose outputs moved
+    takes the case ID of its new file names.
+    """
+    records = load_manifest(Path(src_path).parent)
+    remapped = {}
+    for record in records.values():
+        outputs = {}
+        case_id = record['case_id']
+        for path, stat in record.get('outputs', {}).items():
+            new_path = rename(path)
+            if new_path is None:
+                outputs = None
+                break
+            if new_path != path:
+                case_id = CASE_ID.match(os.path.basename(new_path)).group(0)
+            outputs[new_path] = stat
+        if outputs is not None:
+            remapped[case_id] = dict(record, case_id=case_id, outputs=outputs)
+    with open(dst_path, 'w') as f:
+        for case_id in sorted(remapped):
+            f.write(json.dumps(remapped[case_id], sort_keys=True) + "\n")
+
+def write_manifest(path, records):
+    """Replace the manifest at path with one line per record, atomically"""
+    path = Path(path)
+    tmp_path = path.with_suffix('.jsonl.tmp')
+    with open(tmp_path, 'w') as f:
+        for case_id in sorted(records):
+            f.write(json.dumps(records[case_id], sort_keys=True) + "\n")
+    os.replace(tmp_path, path)
+
+def _truncate_partial_line(path):
+    """Cut a partial last line left by a crash so new records start on a line of their own"""
+    if not path.exists():
+        return
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+class ManifestWriter:
+    """Append manifest records as cases complete, then compact on close"""
+
+    def __init__(self, output_dir):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.records = load_manifest(output_dir)
+        _truncate_partial_line(self.path)
+        self._file = open(self.path, 'a')
+
+    def record(self, entry):
+        """Append one case record and flush it so it survives a crash"""
+        self.records[entry['case_id']] = entry
+        self._file.write(json.dumps(entry, sort_keys=True) + "\n")
+        self._file.flush()
+
+    def close(self, keep_case_ids=None):
+        """
+        Rewrite the manifest with one record per case, dropping cases that
+        are no longer part of the dataset when keep_case_ids is given.
+        Returns the dropped records.
+        """
+        self._file.close()
+        dropped = {}
+        if keep_case_ids is not None:
+            dropped = {k: v for k, v in self.records.items() if k not in keep_case_ids}
+            self.records = {k: v for k, v in self.records.items() if k in keep_case_ids}
+
+        write_manifest(self.path, self.records)
+        return dropped
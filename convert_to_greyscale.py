@@ -1,3 +1,7 @@
+# Converts an existing RGB imagesTr tree to greyscale in place.
+# New conversions can skip this pass: convert_coco_to_nnunet(..., channel_mode='L')
+# decodes the JPEGs straight to luminance and writes 'L' PNGs in one go.
+
 import cv2
 import os
 from pathlib import Path
@@ -22,7 +26,14 @@ for sub in ["Axial", "Coronal"]:
             
         if img.ndim == 3:  # RGB or RGBA
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            cv2.imwrite(str(f), gray)
+            # Write beside the file and rename over it: the image may be a
+            # hardlink to a source in train/ (passthrough='hardlink'), which an
+            # in-place write would overwrite too
+            tmp_path = f.with_name(f".{f.stem}.tmp{f.suffix}")
+            if not cv2.imwrite(str(tmp_path), gray):
+                print(f"Could not write image: {f}")
+                continue
+            os.replace(tmp_path, f)
             print(f"Converted: {f}")
         else:
             print(f"Already greyscale: {f}")
@@ -4,6 +4,8 @@ import os
 import numpy as np
 from PIL import Image
 
+from label_render import render_label_directory
+
 def create_visualization_masks():
     """Create proper grayscale and colored RGB versions from labelsTr"""
     
@@ -32,59 +34,10 @@ def create_visualization_masks():
         print(f"Source directory {source_dir} does not exist!")
         return
     
-    # Get all PNG files from source
-    png_files = [f for f in os.listdir(source_dir) if f.endswith('.png')]
-    print(f"Found {len(png_files)} PNG files in {source_dir}")
-    
-    for config_name, config in configs.items():
-        output_dir = os.path.join(base_dir, config_name)
-        
-        # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
-        
-        print(f"\nCreating {config['description']} in {config_name}...")
-        
-        for i, filename in enumerate(png_files):
-            source_path = os.path.join(source_dir, filename)
-            output_path = os.path.join(output_dir, filename)
-            
-            try:
-                # Load source mask
-                source_img = Image.open(source_path)
-                source_array = np.array(source_img)
-                
-                if config["type"] == "grayscale":
-                    # Create grayscale version
-                    output_array = np.zeros_like(source_array, dtype=np.uint8)
-                    
-                    for class_id, gray_value in config["mapping"].items():
-                        output_array[source_array == class_id] = gray_value
-                    
-                    # Save as grayscale
-                    output_img = Image.fromarray(output_array, mode='L')
-                    
-                elif config["type"] == "rgb":
-                    # Create RGB version
-                    h, w = source_array.shape
-                    output_array = np.zeros((h, w, 3), dtype=np.uint8)
-                    
-                    for class_id, rgb_color in config["mapping"].items():
-                        mask = source_array == class_id
-                        output_array[mask] = rgb_color
-                    
-                    # Save as RGB
-                    output_img = Image.fromarray(output_array, mode='RGB')
-                
-                output_img.save(output_path)
-                
-                if (i + 1) % 50 == 0:
-                    print(f"  Processed {i + 1}/{len(png_files)} files")
-                    
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                continue
-        
-        print(f"Completed creating {len(png_files)} files in {config_name}")
+    # Decode each label map once and render every config from it
+    print("\nCreating " + ", ".join(config["description"] for config in configs.values()) + "...")
+    count = render_label_directory(source_dir, base_dir, variants=configs)
+    print(f"Completed creating {count} files in each of {', '.join(configs)}")
     
     # Verify the results
     print("\nVerifying created visualization masks...")
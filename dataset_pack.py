@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Packed, memory-mapped nnU-Net dataset
+Decodes every imagesTr/labelsTr pair once and appends the raw uint8 pixels to
+two blobs, images.bin and labels.bin, with an index giving each case's byte
+offset and shape:
+
+  image_offsets (N,) int64, image_shapes (N, 3) int32   height, width, channels
+  label_offsets (N,) int64, label_shapes (N, 2) int32   height, width
+  meta.json                                              case ids, source
+
+DatasetPack.load() memory-maps both blobs, so image()/label() return
+zero-copy NumPy views of the page cache instead of opening and decoding a
+PNG per case.
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from dataset_reader import find_cases, load_array
+
+PACK_VERSION = 1
+
+INDEX_NAMES = ('image_offsets', 'image_shapes', 'label_offsets', 'label_shapes')
+
+def _decode_pair(paths):
+    """Decode one image/label pair to C-contiguous uint8 arrays"""
+    image_path, label_path = paths
+    image = load_array(image_path)
+    label = load_array(label_path)
+    if image.dtype != np.uint8 or label.dtype != np.uint8 or label.ndim != 2:
+        raise ValueError(f"Only 8-bit images and single-channel 8-bit labels can be packed: {image_path}")
+    return np.ascontiguousarray(image), np.ascontiguousarray(label)
+
+def pack_dataset(dataset_dir, pack_dir, workers=1):
+    """
+    Pack every image/label pair of dataset_dir into pack_dir. All files are
+    written under temporary names and only swapped in once complete, so an
+    interrupted run leaves the previous pack intact. Returns the number of
+    cases packed.
+    """
+    pack_dir = Path(pack_dir)
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    pairs = find_cases(dataset_dir)
+
+    n = len(pairs)
+    image_offsets = np.zeros(n, dtype=np.int64)
+    image_shapes = np.zeros((n, 3), dtype=np.int32)
+    label_offsets = np.zeros(n, dtype=np.int64)
+    label_shapes = np.zeros((n, 2), dtype=np.int32)
+
+    tasks = [(image_path, label_path) for _, image_path, label_path in pairs]
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    decoded = executor.map(_decode_pair, tasks, chunksize=8) if executor else map(_decode_pair, tasks)
+    try:
+        with open(pack_dir / 'images.bin.tmp', 'wb') as images_out, \
+                open(pack_dir / 'labels.bin.tmp', 'wb') as labels_out:
+            for i, (image, label) in enumerate(decoded):
+                image_offsets[i] = images_out.tell()
+                image_shapes[i] = image.shape if image.ndim == 3 else (*image.shape, 1)
+                images_out.write(image.data)
+                label_offsets[i] = labels_out.tell()
+                label_shapes[i] = label.shape
+                labels_out.write(label.data)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    arrays = {'image_offsets': image_offsets, 'image_shapes': image_shapes,
+              'label_offsets': label_offsets, 'label_shapes': label_shapes}
+    for name, array in arrays.items():
+        with open(pack_dir / f"{name}.npy.tmp", 'wb') as f:
+            np.save(f, array)
+    meta = {'version': PACK_VERSION, 'source': str(dataset_dir), 'case_ids': [case_id for case_id, _, _ in pairs]}
+    with open(pack_dir / 'meta.json.tmp', 'w') as f:
+        json.dump(meta, f)
+    for name in ('images.bin', 'labels.bin', *(f"{name}.npy" for name in INDEX_NAMES), 'meta.json'):
+        os.replace(pack_dir / f"{name}.tmp", pack_dir / name)
+    return n
+
+class DatasetPack:
+    """Zero-copy access to a packed dataset by case ID or position"""
+
+    def __init__(self, images, labels, index, meta):
+        self.images = images
+        self.labels = labels
+        for name in INDEX_NAMES:
+            setattr(self, name, index[name])
+        self.meta = meta
+        self.case_ids = meta['case_ids']
+        self.position = {case_id: i for i, case_id in enumerate(self.case_ids)}
+
+    @classmethod
+    def load(cls, pack_dir):
+        pack_dir = Path(pack_dir)
+        with open(pack_dir / 'meta.json', 'r') as f:
+            meta = json.load(f)
+        index = {name: np.load(pack_dir / f"{name}.npy") for name in INDEX_NAMES}
+        # np.memmap can't map empty files
+        images = np.memmap(pack_dir / 'images.bin', dtype=np.uint8, mode='r') \
+            if os.path.getsize(pack_dir / 'images.bin') else np.zeros(0, dtype=np.uint8)
+        labels = np.memmap(pack_dir / 'labels.bin', dtype=np.uint8, mode='r') \
+            if os.path.getsize(pack_dir / 'labels.bin') else np.zeros(0, dtype=np.uint8)
+        return cls(images, labels, index, meta)
+
+    def __len__(self):
+        return len(self.case_ids)
+
+    def _index(self, case):
+        return case if isinstance(case, (int, np.integer)) else self.position[case]
+
+    def image(self, case):
+        """(H, W) or (H, W, C) read-only view of a case's image"""
+        i = self._index(case)
+        h, w, c = (int(v) for v in self.image_shapes[i])
+        start = int(self.image_offsets[i])
+        view = self.images[start:start + h * w * c]
+        return view.reshape((h, w) if c == 1 else (h, w, c))
+
+    def label(self, case):
+        """(H, W) read-only view of a case's label map"""
+        i = self._index(case)
+        h, w = (int(v) for v in self.label_shapes[i])
+        start = int(self.label_offsets[i])
+        return self.labels[start:start + h * w].reshape(h, w)
+
+    def case(self, case):
+        """(image, label) views of one case"""
+        return self.image(case), self.label(case)
+
+if __name__ == "__main__":
+    import time
+
+    dataset_dir = "nnunet_dataset"
+    pack_dir = "nnunet_dataset.pack"
+
+    start = time.perf_counter()
+    count = pack_dataset(dataset_dir, pack_dir, workers=os.cpu_count() or 1)
+    print(f"Packed {count} cases into {pack_dir} in {time.perf_counter() - start:.1f}s")
+
+    pack = DatasetPack.load(pack_dir)
+    print(f"Images blob: {pack.images.nbytes / 1e6:.1f} MB, labels blob: {pack.labels.nbytes / 1e6:.1f} MB")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Lazy reader over an nnU-Net dataset
+DatasetReader finds every imagesTr/labelsTr pair of a dataset, flat or split
+into plane subdirectories (imagesTr/Axial/..., imagesTr/Coronal/...), and
+decodes cases only when they are asked for:
+
+  for case_id, image, label in DatasetReader("nnunet_dataset"):
+      ...
+
+Iteration keeps a window of cases decoding on a thread pool ahead of the
+consumer (PIL releases the GIL while it inflates a PNG), so file I/O and
+decoding overlap with whatever the caller does with each case. Decoded
+arrays are kept in a bounded LRU and handed out read-only, so random access
+through reader[case_id] and repeated passes over a small dataset don't
+decode the same file twice.
+
+Images and labels may be PNGs or the .npy/.npz files of the NumPy output
+writers (output_writers); load_array() dispatches on the suffix.
+
+A layout view (layout_views) is checked against its store first: find_cases()
+raises StaleView for a view the store has moved on from.
+
+Case IDs are relative to imagesTr: case001 in a flat dataset, Axial/case001
+when cases are split by plane (the same caseNNN can exist in both planes).
+"""
+
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from layout_views import check_view, find_view
+
+IMAGE_SUFFIX = "_0000"
+
+def find_cases(dataset_dir):
+    """(case_id, image path, label path) of every complete pair, in case order"""
+    dataset_dir = Path(dataset_dir)
+    view_dir = find_view(dataset_dir)
+    if view_dir is not None:
+        check_view(view_dir)
+    images_dir = dataset_dir / 'imagesTr'
+    labels_dir = dataset_dir / 'labelsTr'
+    cases = []
+    for image_path in sorted(images_dir.rglob(f'case*{IMAGE_SUFFIX}.*')):
+        rel_path = image_path.relative_to(images_dir)
+        name = image_path.name
+        case_name = name[:name.rindex(IMAGE_SUFFIX)]
+        label_path = labels_dir / rel_path.parent / f"{case_name}{image_path.suffix}"
+        if label_path.exists():
+            case_id = (rel_path.parent / case_name).as_posix()
+            cases.append((case_id, str(image_path), str(label_path)))
+    return cases
+
+def load_array(path):
+    """Read-only array of one image or label file: .npy (memory-mapped), .npz or an image format"""
+    suffix = Path(path).suffix.lower()
+    if suffix == '.npy':
+        return np.load(path, mmap_mode='r')
+    if suffix == '.npz':
+        # NpzWriter stores the array under 'data'
+        with np.load(path) as archive:
+            array = archive['data']
+    else:
+        array = np.asarray(Image.open(path))
+    array.setflags(write=False)
+    return array
+
+def load_case(image_path, label_path, images=True, labels=True):
+    """Decode one pair to read-only arrays; a side that isn't wanted is None"""
+    image = load_array(image_path) if images else None
+    label = load_array(label_path) if labels else None
+    return image, label
+
+class DatasetReader:
+    """
+    Lazy (case_id, image, label) access to a dataset directory.
+    cache_size bounds the number of decoded cases kept in memory, prefetch the
+    number of cases decoded ahead of an iterating consumer. images=False or
+    labels=False skips decoding that side entirely (it is returned as None).
+    """
+
+    def __init__(self, dataset_dir='nnunet_dataset', cache_size=32, prefetch=8, workers=4,
+                 images=True, labels=True):
+        self.dataset_dir = Path(dataset_dir)
+        self.cases = find_cases(dataset_dir)
+        self.case_ids = [case_id for case_id, _, _ in self.cases]
+        self.paths = {case_id: (image_path, label_path) for case_id, image_path, label_path in self.cases}
+        self.cache_size = cache_size
+        self.prefetch = max(prefetch, 1)
+        self.workers = workers
+        self.images = images
+        self.labels = labels
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __len__(self):
+        return len(self.cases)
+
+    def __contains__(self, case_id):
+        return case_id in self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, case_id):
+        with self._lock:
+            if case_id not in self._cache:
+                return None
+            self._cache.move_to_end(case_id)
+            return self._cache[case_id]
+
+    def _store(self, case_id, pair):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[case_id] = pair
+            self._cache.move_to_end(case_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _load(self, case_id):
+        pair = self._cached(case_id)
+        if pair is None:
+            image_path, label_path = self.paths[case_id]
+            pair = load_case(image_path, label_path, self.images, self.labels)
+            self._store(case_id, pair)
+        return pair
+
+    def __getitem__(self, case_id):
+        """(image, label) of one case, decoded now unless it is cached"""
+        if isinstance(case_id, (int, np.integer)):
+            case_id = self.case_ids[case_id]
+        return self._load(case_id)
+
+    def image(self, case_id):
+        return self[case_id][0]
+
+    def label(self, case_id):
+        return self[case_id][1]
+
+    def iter_cases(self, case_ids=None):
+        """
+        Yield (case_id, image, label) for case_ids (default: all, in case
+        order), decoding up to `prefetch` cases ahead on the thread pool.
+        """
+        case_ids = self.case_ids if case_ids is None else list(case_ids)
+        if self.workers <= 1:
+            for case_id in case_ids:
+                yield (case_id, *self._load(case_id))
+            return
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dataset-reader')
+        pending = deque()
+        for case_id in case_ids:
+            pending.append((case_id, self._executor.submit(self._load, case_id)))
+            if len(pending) >= self.prefetch:
+                done_id, future = pending.popleft()
+                yield (done_id, *future.result())
+        while pending:
+            done_id, future = pending.popleft()
+            yield (done_id, *future.result())
+
+    def __iter__(self):
+        return self.iter_cases()
+
+if __name__ == "__main__":
+    import time
+
+    dataset_dir = "nnunet_dataset"
+
+    for workers in (1, 4):
+        reader = DatasetReader(dataset_dir, cache_size=0, workers=workers)
+        start = time.perf_counter()
+        pixels = 0
+        with reader:
+            for case_id, image, label in reader:
+                pixels += int(np.count_nonzero(label))
+        elapsed = time.perf_counter() - start
+        print(f"{len(reader)} cases, {workers} decode thread(s): {elapsed:.2f}s "
+              f"({len(reader) / elapsed:.0f} cases/s, {pixels} labelled pixels)")
@@ -1,24 +1,18 @@
 import numpy as np
 from PIL import Image
-import json
 import os
 
-# Load COCO annotations
-with open('train/_annotations.coco.json', 'r') as f:
-    coco_data = json.load(f)
+from case_catalog import CaseCatalog
+from coco_index import CocoIndex
 
-# Create image ID to filename mapping
-image_id_to_filename = {img['id']: img['file_name'] for img in coco_data['images']}
+# Load the shared COCO index
+index = CocoIndex.load('train/_annotations.coco.json')
+# Case IDs come from the converter's catalog (registry IDs are not positional)
+catalog = CaseCatalog('nnunet_dataset')
 
 # Find images with only cysts, only kidneys, and both
-cyst_images = set()
-kidney_images = set()
-
-for ann in coco_data['annotations']:
-    if ann['category_id'] == 1:  # cyst
-        cyst_images.add(ann['image_id'])
-    elif ann['category_id'] == 2:  # kidney
-        kidney_images.add(ann['image_id'])
+cyst_images = index.image_ids_with_category(1)  # cyst
+kidney_images = index.image_ids_with_category(2)  # kidney
 
 only_cyst = cyst_images - kidney_images
 only_kidney = kidney_images - cyst_images
@@ -39,18 +33,21 @@ for image_id, case_type in test_cases:
     if image_id is None:
         continue
         
-    # Find the corresponding case number
-    filename = image_id_to_filename[image_id]
-    case_num = int(filename.split('.')[0].replace('image', ''))
+    # Find the corresponding case
+    case = catalog.case_for_image(image_id)
+    if case is None:
+        print(f"{case_type} - Image ID {image_id}: no converted case (image dropped or missing)")
+        continue
+    case_id = case['case_id']
     
-    mask_path = f"nnUNet_raw/Dataset001_KidneyCyst/labelsTr/case{case_num:03d}.png"
+    mask_path = f"nnUNet_raw/Dataset001_KidneyCyst/labelsTr/{case_id}.png"
     
     if os.path.exists(mask_path):
         mask = np.array(Image.open(mask_path))
         unique_vals = np.unique(mask)
         non_zero_pixels = np.count_nonzero(mask)
         
-        print(f"\n{case_type} - Image ID {image_id} (case{case_num:03d}.png):")
+        print(f"\n{case_type} - Image ID {image_id} ({case_id}.png):")
         print(f"  Unique values: {unique_vals}")
         print(f"  Non-zero pixels: {non_zero_pixels}")
         print(f"  Shape: {mask.shape}")
@@ -69,11 +66,11 @@ for image_id, case_type in test_cases:
         continue
         
     print(f"\n{case_type} - Image ID {image_id}:")
-    image_annotations = [ann for ann in coco_data['annotations'] if ann['image_id'] == image_id]
+    image_annotations = index.annotations_for(image_id)
     
     for ann in image_annotations:
         category_id = ann['category_id']
-        category_name = next(cat['name'] for cat in coco_data['categories'] if cat['id'] == category_id)
+        category_name = index.category_name(category_id)
         print(f"  Category: {category_name} (ID: {category_id})")
         print(f"  Segmentation type: {type(ann['segmentation'])}")
         if isinstance(ann['segmentation'], list) and len(ann['segmentation']) > 0:
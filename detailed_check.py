@@ -1,19 +1,14 @@
-import json
-import numpy as np
-from PIL import Image
-from collections import defaultdict
+from case_catalog import CaseCatalog
+from coco_index import CocoIndex
+from label_stats import stats_for, value_counts
 
-# Load COCO annotations
-with open('train/_annotations.coco.json', 'r') as f:
-    coco_data = json.load(f)
+# Load the shared COCO index
+index = CocoIndex.load('train/_annotations.coco.json')
+catalog = CaseCatalog('nnunet_dataset')
 
 # Create mappings
-image_id_to_filename = {img['id']: img['file_name'] for img in coco_data['images']}
-
-# Group annotations by image
-image_annotations = defaultdict(list)
-for ann in coco_data['annotations']:
-    image_annotations[ann['image_id']].append(ann)
+image_id_to_filename = {img_id: img['file_name'] for img_id, img in index.images.items()}
+image_annotations = index.annotations_by_image
 
 # Analyze images by their actual annotations
 cyst_only_images = []
@@ -43,36 +38,27 @@ def check_mask_values(img_ids, category_name, max_samples=3):
         # Find corresponding case number
         filename = image_id_to_filename[img_id]
         
-        # Extract case number from filename (this is tricky with the current naming)
-        # Let's use a different approach - find the mask file
+        # Look the case up in the converter's case catalog
+        case = catalog.case_for_image(img_id)
         case_found = False
-        for case_num in range(1, 400):  # Check reasonable range
-            case_id = f"{case_num:03d}"
-            mask_path = f"nnunet_dataset/labelsTr/{case_id}.png"
+        record = stats_for(case['label_path']) if case else None
+        if record is not None:
+            counts = value_counts(record)
+            unique_vals = sorted(counts)
+            
+            # Get expected categories for this image
+            annotations = image_annotations[img_id]
+            expected_categories = set(ann['category_id'] for ann in annotations)
+            
+            print(f"  Image {img_id} (filename: {filename[:30]}...)")
+            print(f"    Expected categories: {expected_categories}")
+            print(f"    {case['case_id']} mask unique values: {unique_vals}")
+            
+            for val in unique_vals:
+                if val > 0:  # Skip background
+                    print(f"      Value {val} pixels: {counts[val]}")
             
-            try:
-                mask = np.array(Image.open(mask_path))
-                # Check if this mask corresponds to our image by checking annotations
-                unique_vals = np.unique(mask)
-                
-                # Get expected categories for this image
-                annotations = image_annotations[img_id]
-                expected_categories = set(ann['category_id'] for ann in annotations)
-                
-                print(f"  Image {img_id} (filename: {filename[:30]}...)")
-                print(f"    Expected categories: {expected_categories}")
-                print(f"    Case {case_num} mask unique values: {unique_vals}")
-                
-                for val in unique_vals:
-                    if val > 0:  # Skip background
-                        count = np.sum(mask == val)
-                        print(f"      Value {val} pixels: {count}")
-                
-                case_found = True
-                break
-                
-            except FileNotFoundError:
-                continue
+            case_found = True
         
         if not case_found:
             print(f"  Image {img_id}: No corresponding mask found")
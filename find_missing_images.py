@@ -4,17 +4,15 @@ Find which specific images from the train folder were not converted.
 """
 
 import os
-import json
 from pathlib import Path
 
+from case_catalog import CaseCatalog
+from coco_stream import iter_coco_section
+
 def get_converted_image_names():
     """Get the original image names that were converted."""
-    # Load the COCO annotations to see which images were processed
-    with open("train/_annotations.coco.json", "r") as f:
-        coco_data = json.load(f)
-    
-    # Get all image filenames from COCO data
-    coco_images = {img["file_name"] for img in coco_data["images"]}
+    # Get all image filenames from COCO data, streaming only the images section
+    coco_images = {img["file_name"] for img in iter_coco_section("train/_annotations.coco.json", "images")}
     
     return coco_images
 
@@ -28,22 +26,6 @@ def get_all_train_images():
     
     return all_images
 
-def get_converted_cases():
-    """Get case numbers that were actually converted to nnU-Net format."""
-    images_dir = Path("nnunet_dataset/imagesTr")
-    converted_cases = set()
-    
-    # Check both Axial and Coronal subdirectories
-    for subdir in ["Axial", "Coronal"]:
-        subdir_path = images_dir / subdir
-        if subdir_path.exists():
-            for file in subdir_path.glob("*.png"):
-                # Extract case number from case002_0000.png -> case002
-                case_name = file.stem.replace("_0000", "")
-                converted_cases.add(case_name)
-    
-    return converted_cases
-
 def main():
     """Main function to find missing images."""
     print("Finding missing images from train folder...\n")
@@ -56,8 +38,9 @@ def main():
     coco_images = get_converted_image_names()
     print(f"Images in COCO annotations: {len(coco_images)}")
     
-    # Get cases that were actually converted
-    converted_cases = get_converted_cases()
+    # Get cases that were actually converted, from the converter's case catalog
+    catalog = CaseCatalog("nnunet_dataset")
+    converted_cases = {case['case_id'] for case in catalog.cases() if os.path.exists(case['image_path'])}
     print(f"Cases converted to nnU-Net: {len(converted_cases)}")
     
     # Find images not in COCO annotations
@@ -67,26 +50,17 @@ def main():
         for img in sorted(missing_from_coco):
             print(f"  {img}")
     
-    # Find images in COCO but not converted
-    # First, map COCO images to expected case names
-    coco_case_mapping = {}
+    # Find images in COCO but not converted: no catalog entry, or its image is gone
+    missing_conversions = {}
     for img_name in coco_images:
-        # Extract case number from filename (assuming format like Cyst-X-...)
-        if img_name.startswith("Cyst-"):
-            parts = img_name.split("-")
-            if len(parts) >= 2:
-                case_num = int(parts[1])
-                case_name = f"case{case_num:03d}"
-                coco_case_mapping[case_name] = img_name
-    
-    expected_cases = set(coco_case_mapping.keys())
-    missing_conversions = expected_cases - converted_cases
+        case = catalog.case_for_file(img_name)
+        if case is None or case['case_id'] not in converted_cases:
+            missing_conversions[img_name] = case['case_id'] if case else "no case"
     
     if missing_conversions:
         print(f"\nImages in COCO annotations but NOT converted to nnU-Net ({len(missing_conversions)}):")
-        for case in sorted(missing_conversions):
-            original_name = coco_case_mapping.get(case, "unknown")
-            print(f"  {case} (original: {original_name})")
+        for img_name, case_id in sorted(missing_conversions.items(), key=lambda item: item[1]):
+            print(f"  {case_id} (original: {img_name})")
     
     print(f"\nSummary:")
     print(f"  - {len(missing_from_coco)} images not in COCO annotations")
@@ -1,21 +1,22 @@
-import json
+from case_catalog import CaseCatalog
+from coco_stream import scan_coco
 
 def find_no_annotation_cases():
-    # Load COCO data
-    with open('train/_annotations.coco.json', 'r') as f:
-        coco_data = json.load(f)
+    # Load COCO data (annotations are streamed and only counted per image)
+    coco_data = scan_coco('train/_annotations.coco.json')
     
     # Get images with annotations
-    images_with_annotations = set()
-    for ann in coco_data['annotations']:
-        images_with_annotations.add(ann['image_id'])
+    images_with_annotations = set(coco_data['annotation_counts'])
     
-    # Find images without annotations and their case numbers
+    # Find images without annotations and their cases (from the converter's
+    # catalog; registry case IDs don't follow image positions)
+    catalog = CaseCatalog('nnunet_dataset')
     images_without_annotations = []
-    for i, img_info in enumerate(coco_data['images']):
+    for img_info in coco_data['images']:
         img_id = img_info['id']
         if img_id not in images_with_annotations:
-            case_id = f"case{i+1:03d}"
+            case = catalog.case_for_image(img_id)
+            case_id = case['case_id'] if case else 'not converted'
             images_without_annotations.append({
                 'case_id': case_id,
                 'image_id': img_id,
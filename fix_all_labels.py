@@ -2,6 +2,8 @@ import numpy as np
 from PIL import Image
 import os
 
+from label_remap import list_masks, print_report, remap_files
+
 def fix_all_label_directories():
     """Fix all label directories to use consistent [0, 1, 2] class IDs"""
     
@@ -22,41 +24,16 @@ def fix_all_label_directories():
         if not os.path.exists(dir_path):
             print(f"  ❌ Directory not found: {dir_path}")
             continue
-            
-        files = [f for f in os.listdir(dir_path) if f.endswith('.png')]
-        files_fixed = 0
         
-        for i, filename in enumerate(files):
-            file_path = os.path.join(dir_path, filename)
-            
-            try:
-                # Load the mask
-                mask = np.array(Image.open(file_path))
-                original_values = np.unique(mask)
-                
-                # Check if it needs fixing
-                if not np.array_equal(sorted(original_values), [0, 1, 2]):
-                    # Create a new mask with correct values
-                    new_mask = np.zeros_like(mask)
-                    
-                    # Map values to class IDs
-                    # Background (darkest) -> 0
-                    # First class (medium) -> 1  
-                    # Second class (brightest) -> 2
-                    sorted_vals = sorted(original_values)
-                    
-                    for i, val in enumerate(sorted_vals):
-                        new_mask[mask == val] = i
-                    
-                    # Save the corrected mask
-                    Image.fromarray(new_mask.astype(np.uint8)).save(file_path)
-                    files_fixed += 1
-                    
-            except Exception as e:
-                print(f"    ❌ Error processing {filename}: {e}")
-                continue
+        # Map values to class IDs by rank, one lookup table per file:
+        # Background (darkest) -> 0
+        # First class (medium) -> 1
+        # Second class (brightest) -> 2
+        report = remap_files(list_masks(dir_path), 'rank', workers=os.cpu_count() or 1)
+        counts = print_report(report)
+        files_fixed = counts.get('changed', 0)
         
-        print(f"  ✓ {dir_name}: {files_fixed}/{len(files)} files fixed")
+        print(f"  ✓ {dir_name}: {files_fixed}/{len(report)} files fixed")
         total_fixed += files_fixed
     
     print()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Header-only image validation
+Reads just the PNG IHDR chunk or the JPEG SOF segment of each file to get
+width, height, bit depth and channel layout, without decoding any pixels.
+That is enough to cross-check the COCO width/height fields against the
+images in train/ and to check that every nnU-Net image/label pair agrees in
+size and that labels are single-channel, at header-read speed.
+"""
+
+import os
+import struct
+from pathlib import Path
+
+from coco_stream import iter_coco_section
+from dataset_reader import find_cases
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG colour type -> (PIL-style mode, channels)
+PNG_COLOR_TYPES = {
+    0: ('L', 1),
+    2: ('RGB', 3),
+    3: ('P', 1),
+    4: ('LA', 2),
+    6: ('RGBA', 4),
+}
+
+# JPEG component count -> mode
+JPEG_MODES = {1: 'L', 3: 'RGB', 4: 'CMYK'}
+
+# Start-of-frame markers (DHT 0xC4, JPG 0xC8 and DAC 0xCC share the range but aren't frames)
+SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+class HeaderError(ValueError):
+    """A file is not a PNG/JPEG or its header is truncated or malformed"""
+
+def _png_header(f):
+    data = f.read(33)
+    if len(data) < 33 or data[12:16] != b'IHDR':
+        raise HeaderError("truncated or missing PNG IHDR")
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', data[16:26])
+    if color_type not in PNG_COLOR_TYPES:
+        raise HeaderError(f"invalid PNG color type {color_type}")
+    mode, channels = PNG_COLOR_TYPES[color_type]
+    if color_type == 0 and bit_depth == 16:
+        mode = 'I;16'
+    elif color_type == 0 and bit_depth == 1:
+        mode = '1'
+    return {'format': 'PNG', 'width': width, 'height': height,
+            'bit_depth': bit_depth, 'channels': channels, 'mode': mode}
+
+def _jpeg_header(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':  # Fill bytes
+            byte = f.read(1)
+        if not byte:
+            raise HeaderError("no JPEG SOF marker before end of file")
+        marker = byte[0]
+        if marker == 0xD8 or marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            continue  # Markers without a length field
+        if marker == 0xD9 or marker == 0xDA:
+            raise HeaderError("no JPEG SOF marker before image data")
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            raise HeaderError("truncated JPEG segment")
+        length = struct.unpack('>H', length_bytes)[0]
+        if marker in SOF_MARKERS:
+            data = f.read(6)
+            if len(data) < 6:
+                raise HeaderError("truncated JPEG SOF segment")
+            bit_depth, height, width, channels = struct.unpack('>BHHB', data)
+            return {'format': 'JPEG', 'width': width, 'height': height, 'bit_depth': bit_depth,
+                    'channels': channels, 'mode': JPEG_MODES.get(channels, f"{channels}ch")}
+        f.seek(length - 2, os.SEEK_CUR)
+
+def read_header(path):
+    """
+    Format, width, height, bit depth, channel count and PIL-style mode of a
+    PNG or JPEG, read from its header. Raises HeaderError for anything else.
+    """
+    with open(path, 'rb') as f:
+        start = f.read(8)
+        if start == PNG_SIGNATURE:
+            f.seek(0)
+            return _png_header(f)
+        if start[:2] == b'\xff\xd8':
+            return _jpeg_header(f)
+    raise HeaderError("not a PNG or JPEG file")
+
+def _try_read_header(path):
+    try:
+        return read_header(path), None
+    except (OSError, HeaderError) as e:
+        return None, str(e)
+
+def validate_coco_images(coco_json_path, images_dir):
+    """
+    Check every COCO image record against the header of its file.
+    Returns a list of problem dicts (file, check, message).
+    """
+    problems = []
+    for img in iter_coco_section(coco_json_path, 'images'):
+        path = Path(images_dir) / img['file_name']
+        header, error = _try_read_header(path)
+        if header is None:
+            problems.append({'file': str(path), 'check': 'read', 'message': error})
+        elif (header['width'], header['height']) != (img.get('width'), img.get('height')):
+            problems.append({'file': str(path), 'check': 'coco_size',
+                             'message': f"COCO says {img.get('width')}x{img.get('height')}, "
+                                        f"file is {header['width']}x{header['height']}"})
+    return problems
+
+def validate_pairs(dataset_dir, image_modes=('RGB', 'L'), label_modes=('L', 'P')):
+    """
+    Check every imagesTr/labelsTr pair of a PNG dataset, flat or split into
+    plane subdirectories: both readable, same size, image mode in
+    image_modes, 8-bit label mode in label_modes. A dataset without any
+    pair is a problem too. Returns a list of problem dicts (file, check,
+    message).
+    """
+    pairs = [(Path(image_path), Path(label_path)) for _, image_path, label_path in find_cases(dataset_dir)
+             if image_path.endswith('.png')]
+    if not pairs:
+        return [{'file': str(dataset_dir), 'check': 'pairs',
+                 'message': "no imagesTr/labelsTr PNG pairs found"}]
+    problems = []
+    for image_path, label_path in pairs:
+        image, error = _try_read_header(image_path)
+        if image is None:
+            problems.append({'file': str(image_path), 'check': 'read', 'message': error})
+            continue
+        if image['mode'] not in image_modes:
+            problems.append({'file': str(image_path), 'check': 'image_mode',
+                             'message': f"mode {image['mode']}, expected one of {list(image_modes)}"})
+        label, error = _try_read_header(label_path)
+        if label is None:
+            problems.append({'file': str(label_path), 'check': 'read', 'message': error})
+            continue
+        if label['mode'] not in label_modes or label['bit_depth'] > 8:
+            problems.append({'file': str(label_path), 'check': 'label_mode',
+                             'message': f"mode {label['mode']} ({label['bit_depth']}-bit), "
+                                        f"expected 8-bit or less {list(label_modes)}"})
+        if (image['width'], image['height']) != (label['width'], label['height']):
+            problems.append({'file': str(label_path), 'check': 'pair_size',
+                             'message': f"image is {image['width']}x{image['height']}, "
+                                        f"label is {label['width']}x{label['height']}"})
+    return problems
+
+if __name__ == "__main__":
+    import time
+
+    checks = [
+        ("COCO records vs train/", lambda: validate_coco_images("train/_annotations.coco.json", "train")),
+        ("nnunet_dataset image/label pairs", lambda: validate_pairs("nnunet_dataset")),
+    ]
+    for name, check in checks:
+        start = time.perf_counter()
+        problems = check()
+        print(f"{name}: {len(problems)} problems ({time.perf_counter() - start:.2f}s)")
+        for problem in problems[:20]:
+            print(f"  [{problem['check']}] {problem['file']}: {problem['message']}")
+        if len(problems) > 20:
+            print(f"  ... and {len(problems) - 20} more")
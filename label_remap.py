@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Batch label remapping through 256-entry lookup tables
+Every relabel job (greyscale repair, rescaling for visibility, reverting it)
+is a per-value mapping of uint8 pixels, so it is expressed once as a lookup
+table and applied with a single `lut[mask]` indexing pass per file.
+
+A rule is one of:
+  dict          {old_value: new_value}; unmapped values keep their value, or
+                become `default` when one is given
+  list          [(low, high, new_value), ...] inclusive ranges (quantization)
+  'rank'        per-file rule: the sorted values present become 0, 1, 2, ...
+  np.ndarray    a ready (256,) uint8 table
+or a name from PRESETS.
+
+remap_files() runs the rule over many files across a worker pool. Files are
+only rewritten when their content changes, through a temporary file and
+os.replace so an interrupted run never leaves a half-written mask; with
+dry_run=True nothing is written and the report lists what would change.
+Palette-mode files (the paletted_variants mirrors) are skipped: their pixels
+are class indices and their palette holds the display values, so remapping
+the indices would point them past the palette.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+PRESETS = {
+    # Greyscale-looking label maps back to class ids: 0/1/2 stay, dark -> 0,
+    # mid grey (~128) -> 1 kidney, bright (~255) -> 2 cyst. Unlike the old
+    # fix_mask_labels loop, 1s and 2s in mixed masks are kept, not zeroed.
+    'fix_greyscale': [(0, 0, 0), (1, 1, 1), (2, 2, 2), (3, 63, 0), (64, 191, 1), (192, 255, 2)],
+    'visible_to_classes': {0: 0, 128: 1, 255: 2},
+    'classes_to_visible': {0: 0, 1: 128, 2: 255},
+    'rank': 'rank',
+}
+
+def mapping_lut(mapping, default=None):
+    """Lookup table for a {old_value: new_value} mapping"""
+    lut = np.arange(256, dtype=np.uint8) if default is None else np.full(256, default, dtype=np.uint8)
+    for old_value, new_value in mapping.items():
+        lut[int(old_value)] = new_value
+    return lut
+
+def range_lut(ranges):
+    """Lookup table for inclusive (low, high, new_value) ranges; other values are kept"""
+    lut = np.arange(256, dtype=np.uint8)
+    for low, high, new_value in ranges:
+        lut[low:high + 1] = new_value
+    return lut
+
+def rank_lut(histogram):
+    """Per-file table mapping the present values, in sorted order, to 0, 1, 2, ..."""
+    present = np.flatnonzero(histogram)
+    lut = np.arange(256, dtype=np.uint8)
+    lut[present] = np.arange(len(present))
+    return lut
+
+def build_lut(rule, default=None):
+    """
+    Turn a rule into a (256,) uint8 table, or return 'rank' for the per-file
+    rank rule
+    """
+    if isinstance(rule, str):
+        if rule not in PRESETS:
+            raise ValueError(f"Unknown remap rule: {rule}")
+        rule = PRESETS[rule]
+        if isinstance(rule, str):
+            return rule
+    if isinstance(rule, np.ndarray):
+        if rule.shape != (256,):
+            raise ValueError(f"Lookup table must have shape (256,), got {rule.shape}")
+        return rule.astype(np.uint8)
+    if isinstance(rule, dict):
+        return mapping_lut(rule, default)
+    return range_lut(rule)
+
+def _write_atomic(img, path):
+    """Save next to path, then swap it in"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    img.save(tmp_path, format=Image.registered_extensions().get(path.suffix.lower(), 'PNG'))
+    os.replace(tmp_path, path)
+
+def remap_file(task):
+    """
+    Apply a table to one file. task is (path, lut or 'rank', dry_run).
+    Returns a report entry: path, status, values before and after.
+    """
+    path, lut, dry_run = task
+    entry = {'path': str(path)}
+    try:
+        img = Image.open(path)
+        if img.mode == 'P':
+            entry['status'] = 'skipped'
+            entry['reason'] = "palette-mode image; its palette, not its pixels, holds the display values"
+            return entry
+        img.load()
+        mask = np.array(img)
+        if mask.dtype != np.uint8:
+            entry['status'] = 'skipped'
+            entry['reason'] = f"unsupported pixel type {mask.dtype}"
+            return entry
+
+        histogram = np.bincount(mask.ravel(), minlength=256)
+        if isinstance(lut, str):
+            lut = rank_lut(histogram)
+        before = np.flatnonzero(histogram)
+        entry['before'] = before.tolist()
+        entry['after'] = np.unique(lut[before]).tolist()
+
+        # Only values actually present matter for whether the file changes
+        if np.array_equal(lut[before], before):
+            entry['status'] = 'unchanged'
+            return entry
+
+        entry['status'] = 'would change' if dry_run else 'changed'
+        if not dry_run:
+            _write_atomic(Image.fromarray(lut[mask]), path)
+    except Exception as e:
+        entry['status'] = 'error'
+        entry['reason'] = str(e)
+    return entry
+
+def remap_files(paths, rule, default=None, workers=1, dry_run=False):
+    """
+    Remap every file in paths with one rule. Returns report entries in the
+    order of paths (see remap_file).
+    """
+    lut = build_lut(rule, default)
+    tasks = [(str(path), lut, dry_run) for path in paths]
+    if workers <= 1:
+        return [remap_file(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(remap_file, tasks, chunksize=16))
+
+def list_masks(*dirs, suffix='.png'):
+    """Sorted mask files directly inside each existing directory"""
+    paths = []
+    for dir_path in dirs:
+        if os.path.isdir(dir_path):
+            paths.extend(sorted(Path(dir_path) / f for f in os.listdir(dir_path) if f.endswith(suffix)))
+    return paths
+
+def print_report(report, verbose=False):
+    """Print a status summary, plus the value mapping of each changed file if verbose"""
+    counts = {}
+    for entry in report:
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+        if entry['status'] in ('error', 'skipped'):
+            print(f"  {entry['status']}: {entry['path']}: {entry['reason']}")
+        elif verbose and entry['status'] in ('changed', 'would change'):
+            print(f"  {entry['status']}: {entry['path']}: {entry['before']} -> {entry['after']}")
+    print(f"Files: {len(report)} " + ", ".join(f"{status}: {n}" for status, n in sorted(counts.items())))
+    return counts
+
+if __name__ == "__main__":
+    labels_dir = "nnunet_dataset/labelsTr"
+    paths = list_masks(labels_dir, *(os.path.join(labels_dir, d) for d in ("Axial", "Coronal")))
+
+    print(f"Dry run of 'fix_greyscale' over {len(paths)} masks in {labels_dir}:")
+    print_report(remap_files(paths, 'fix_greyscale', workers=os.cpu_count() or 1, dry_run=True), verbose=True)
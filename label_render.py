@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Render visual variants of nnU-Net label maps with lookup tables
+A label map holds class indices (0 background, 1 kidney, 2 cyst), which look
+black in an image viewer. Each variant maps every class index to a grey
+value or an RGB colour through a 256-entry lookup table, so rendering is a
+single `lut[mask]` indexing pass whatever the number of classes.
+
+The converter renders the configured variants straight from the mask it
+just rasterized; render_label_directory() does the same for an existing
+labelsTr, decoding each label map once for all variants.
+
+With paletted=True a variant is written as a palette-mode PNG instead: the
+pixels stay the class indices, the grey values/colours live only in the
+palette, and the bit depth is the lowest that fits the class count (2 bits
+for background/kidney/cyst). Such mirrors are much smaller and
+load_class_map() gets the class ids straight back out of them.
+"""
+
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from output_writers import atomic_path
+
+# Output directory name -> variant config (same mappings as the old scripts)
+DEFAULT_VARIANTS = {
+    "labelsTr_visible": {
+        "type": "grayscale",
+        "mapping": {0: 0, 1: 128, 2: 255},  # Background: black, kidney: gray, cyst: white
+    },
+    "labelsTr_colored": {
+        "type": "rgb",
+        "mapping": {
+            0: [0, 0, 0],       # Background: black
+            1: [255, 0, 0],     # Kidney: red
+            2: [0, 200, 255],   # Cyst: cyan
+        },
+    },
+}
+
+def build_lut(variant):
+    """256-entry uint8 lookup table ((256,) grey or (256, 3) RGB) for a variant config"""
+    if variant["type"] == "grayscale":
+        lut = np.zeros(256, dtype=np.uint8)
+    elif variant["type"] == "rgb":
+        lut = np.zeros((256, 3), dtype=np.uint8)
+    else:
+        raise ValueError(f"Unknown variant type: {variant['type']}")
+    for class_id, value in variant["mapping"].items():
+        lut[int(class_id)] = value
+    return lut
+
+def build_luts(variants=None):
+    """Lookup tables for every variant, keyed by output directory name"""
+    if variants is None:
+        variants = DEFAULT_VARIANTS
+    return {name: build_lut(variant) for name, variant in variants.items()}
+
+def render(mask, lut):
+    """Apply a lookup table to a uint8 label map"""
+    return lut[mask]
+
+def palette_bits(num_colors):
+    """Lowest PNG palette bit depth (1, 2, 4 or 8) holding num_colors entries"""
+    for bits in (1, 2, 4):
+        if num_colors <= 1 << bits:
+            return bits
+    return 8
+
+def palette_from_lut(lut, num_colors):
+    """Flat [r, g, b, ...] palette of the first num_colors entries of a lookup table"""
+    entries = lut[:num_colors]
+    if entries.ndim == 1:
+        entries = np.repeat(entries[:, None], 3, axis=1)
+    return entries.ravel().tolist()
+
+def lut_size(lut):
+    """Number of leading lookup table entries up to the last non-black one"""
+    nonzero = np.flatnonzero(lut.reshape(len(lut), -1).any(axis=1))
+    return int(nonzero[-1]) + 1 if len(nonzero) else 1
+
+def render_paletted(mask, lut):
+    """
+    Palette-mode image holding the class indices of mask, coloured by lut.
+    Returns (image, bits).
+    """
+    # Every class index present must have a palette entry
+    num_colors = max(lut_size(lut), int(mask.max()) + 1)
+    img = Image.fromarray(mask)
+    # Attaching a palette turns the 'L' image into 'P' without touching the pixels
+    img.putpalette(palette_from_lut(lut, num_colors))
+    return img, palette_bits(num_colors)
+
+def save_variants(mask, luts, paths, paletted=False):
+    """
+    Render mask through each lookup table and save it as PNG.
+    paths maps variant name -> output path. Returns the written paths.
+    """
+    written = []
+    for name, lut in luts.items():
+        with atomic_path(paths[name]) as tmp_path:
+            if paletted:
+                img, bits = render_paletted(mask, lut)
+                img.save(tmp_path, 'PNG', bits=bits)
+            else:
+                Image.fromarray(render(mask, lut)).save(tmp_path, 'PNG')
+        written.append(paths[name])
+    return written
+
+def load_class_map(path):
+    """
+    Class indices of a raw label map or a paletted mirror, or None for an
+    RGB mirror. Greyscale mirrors written without a palette hold rendered
+    grey values, not class ids.
+    """
+    img = Image.open(path)
+    if img.mode == 'RGB':
+        return None
+    return np.array(img)
+
+def render_label_directory(labels_dir, base_dir=None, variants=None, paletted=False):
+    """
+    Write every variant for all label maps in labels_dir, decoding each label
+    map once. Variant directories are created next to labels_dir unless
+    base_dir is given. Returns the number of label maps rendered.
+    """
+    labels_dir = Path(labels_dir)
+    base_dir = Path(base_dir) if base_dir is not None else labels_dir.parent
+    luts = build_luts(variants)
+    for name in luts:
+        (base_dir / name).mkdir(parents=True, exist_ok=True)
+
+    mask_files = sorted(f for f in os.listdir(labels_dir) if f.endswith('.png'))
+    for i, mask_file in enumerate(mask_files, 1):
+        mask = np.array(Image.open(labels_dir / mask_file))
+        save_variants(mask, luts, {name: base_dir / name / mask_file for name in luts}, paletted)
+
+        if i % 50 == 0 or i == len(mask_files):
+            print(f"Processed {i}/{len(mask_files)} masks")
+    return len(mask_files)
+
+if __name__ == "__main__":
+    paletted = False  # True: palette-mode mirrors that keep the class indices
+    count = render_label_directory("nnunet_dataset/labelsTr", paletted=paletted)
+    print(f"\nRendered {len(DEFAULT_VARIANTS)} variants for {count} label maps: {', '.join(DEFAULT_VARIANTS)}")
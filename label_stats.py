@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Single-pass label statistics with a cached sidecar
+Each label map is decoded once and summarized with np.bincount: image shape
+and the pixel count of every value present. Presence flags and class
+combination signatures follow from the counts, so every report the
+verification scripts print is a query over these small records.
+
+Label maps are PNGs by default; collect_label_stats(file_ending='.npy' or
+'.npz') covers the NumPy output writers, read through dataset_reader.
+
+Records are stored in a JSON sidecar inside the labels directory, keyed by
+file path and checked against the file's size and mtime. A file whose
+size/mtime changed but whose SHA-256 still matches keeps its record, so
+only label maps whose content actually changed are decoded again.
+"""
+
+import atexit
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from conversion_manifest import file_sha256
+from dataset_reader import load_array
+
+STATS_NAME = ".label_stats.json"
+
+# Bump when the record layout changes so stale sidecars are rebuilt
+STATS_VERSION = 1
+
+def compute_stats(path):
+    """Decode one label map and return its statistics record"""
+    st = os.stat(path)
+    if Path(path).suffix.lower() in ('.npy', '.npz'):
+        mask, mode = np.asarray(load_array(path)), None
+    else:
+        img = Image.open(path)
+        mask, mode = np.array(img), img.mode
+    values = mask.ravel() if mask.dtype == np.uint8 else mask.ravel().astype(np.int64)
+    counts = np.bincount(values, minlength=256)
+    present = np.flatnonzero(counts)
+    return {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': file_sha256(path),
+        'mode': mode,
+        'shape': list(mask.shape),
+        'counts': {str(value): int(counts[value]) for value in present},
+    }
+
+def _load_sidecar(sidecar_path):
+    try:
+        with open(sidecar_path, 'r') as f:
+            sidecar = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if sidecar.get('version') != STATS_VERSION:
+        return {}
+    return sidecar.get('files', {})
+
+def _save_sidecar(sidecar_path, records):
+    tmp_path = sidecar_path.with_name(sidecar_path.name + '.tmp')
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': STATS_VERSION, 'files': records}, f, sort_keys=True)
+        os.replace(tmp_path, sidecar_path)
+    except OSError as e:
+        print(f"Warning: could not write label statistics {sidecar_path}: {e}")
+
+def _record_is_current(record, path):
+    """True when the cached record still describes path (checked by size/mtime, then hash)"""
+    st = os.stat(path)
+    if record.get('size') == st.st_size and record.get('mtime_ns') == st.st_mtime_ns:
+        return True
+    if record.get('size') == st.st_size and record.get('sha256') == file_sha256(path):
+        record['mtime_ns'] = st.st_mtime_ns
+        return True
+    return False
+
+def collect_label_stats(labels_dir, recursive=False, workers=1, use_cache=True, file_ending='.png'):
+    """
+    Statistics of every label map ending in file_ending in labels_dir (and its
+    subdirectories when recursive), keyed by path relative to labels_dir.
+    Only label maps that changed since the sidecar was written are decoded,
+    across a process pool.
+    """
+    labels_dir = Path(labels_dir)
+    sidecar_path = labels_dir / STATS_NAME
+    pattern = f'**/*{file_ending}' if recursive else f'*{file_ending}'
+    rel_paths = sorted(str(p.relative_to(labels_dir)) for p in labels_dir.glob(pattern))
+
+    cached = _load_sidecar(sidecar_path) if use_cache else {}
+    records = {}
+    stale = []
+    for rel_path in rel_paths:
+        record = cached.get(rel_path)
+        if record is not None and _record_is_current(record, labels_dir / rel_path):
+            records[rel_path] = record
+        else:
+            stale.append(rel_path)
+
+    paths = [str(labels_dir / rel_path) for rel_path in stale]
+    if workers > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fresh = list(executor.map(compute_stats, paths, chunksize=16))
+    else:
+        fresh = [compute_stats(path) for path in paths]
+    records.update(zip(stale, fresh))
+
+    if use_cache and (stale or set(cached) != set(records)):
+        _save_sidecar(sidecar_path, records)
+    return {rel_path: records[rel_path] for rel_path in rel_paths}
+
+def value_counts(record):
+    """{value: pixel count} of one record with integer keys"""
+    return {int(value): count for value, count in record['counts'].items()}
+
+def signature(record):
+    """Sorted tuple of the values present in one label map"""
+    return tuple(sorted(value_counts(record)))
+
+def has_value(record, value):
+    return str(value) in record['counts']
+
+def all_values(stats):
+    """Every value present anywhere in the dataset"""
+    return sorted({value for record in stats.values() for value in value_counts(record)})
+
+def combination_counts(stats):
+    """{signature: number of label maps}"""
+    combinations = {}
+    for record in stats.values():
+        combo = signature(record)
+        combinations[combo] = combinations.get(combo, 0) + 1
+    return combinations
+
+def total_counts(stats):
+    """Pixel count of every value summed over the dataset"""
+    totals = {}
+    for record in stats.values():
+        for value, count in value_counts(record).items():
+            totals[value] = totals.get(value, 0) + count
+    return totals
+
+# Sidecar records per labels directory, loaded once per process by stats_for
+_sidecars = {}
+_dirty_sidecars = set()
+
+def _flush_sidecars():
+    for sidecar_path in _dirty_sidecars:
+        _save_sidecar(sidecar_path, _sidecars[sidecar_path])
+    _dirty_sidecars.clear()
+
+def stats_for(path, use_cache=True):
+    """
+    Record of a single label map, served from its directory's sidecar.
+    The sidecar is read once per process and only this file is checked, so
+    looking up every file of a directory stays linear. Records decoded here
+    are written back to the sidecar when the process exits.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    if not use_cache:
+        return compute_stats(path)
+
+    sidecar_path = path.parent / STATS_NAME
+    records = _sidecars.get(sidecar_path)
+    if records is None:
+        records = _sidecars[sidecar_path] = _load_sidecar(sidecar_path)
+    record = records.get(path.name)
+    if record is None or not _record_is_current(record, path):
+        record = records[path.name] = compute_stats(path)
+        if not _dirty_sidecars:
+            atexit.register(_flush_sidecars)
+        _dirty_sidecars.add(sidecar_path)
+    return record
+
+if __name__ == "__main__":
+    labels_dir = "nnunet_dataset/labelsTr"
+    stats = collect_label_stats(labels_dir, recursive=True, workers=os.cpu_count() or 1)
+
+    print(f"Label maps: {len(stats)}")
+    print(f"Values present: {all_values(stats)}")
+    print(f"Pixels per value: {total_counts(stats)}")
+    print("Combinations:")
+    for combo, count in sorted(combination_counts(stats).items()):
+        print(f"  {combo}: {count} label maps")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Layout views over one canonical dataset
+The converter output (flat imagesTr/labelsTr/label mirrors plus the case
+catalog) is the canonical store. Instead of moving its files between a flat
+and a per-plane layout, materialize_view() builds the layout wanted as a
+farm of hardlinks or symlinks in a separate directory:
+
+  flat      <view>/imagesTr/case001_0000.png, <view>/labelsTr/case001.png, ...
+  planes    <view>/imagesTr/Axial/..., <view>/imagesTr/Coronal/..., ...
+  datasets  <view>/<dataset_name>_Axial/imagesTr/..., one nnU-Net dataset
+            folder per plane, each with its own dataset.json
+
+Planes come from the case catalog (Roboflow user tags); untagged cases are
+only part of the flat view. The whole link plan is checked for conflicts
+before anything is created, every view gets a dataset.json with the right
+numTraining, and rebuilding a view only adds missing links and drops stale
+ones. No file data is ever moved or copied.
+
+The converter replaces outputs instead of writing into them, so a hardlink
+view keeps the previous conversion of a case whole; the case set may also
+have changed since the view was built. .layout_view.json records the state
+of the store files the view was built from (inode, size, mtime), and
+check_view() raises StaleView when the store has moved on. Readers of this
+repo call it before using a view; materialize_view() rebuilds one.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from case_catalog import CaseCatalog
+
+TREES = ('imagesTr', 'labelsTr', 'labelsTr_visible', 'labelsTr_colored')
+LAYOUTS = ('flat', 'planes', 'datasets')
+VIEW_MARKER = ".layout_view.json"
+
+class LayoutConflict(Exception):
+    """The link plan maps two sources to one path or would overwrite a foreign file"""
+
+class StaleView(Exception):
+    """The store changed after the view was built; rebuild it with materialize_view()"""
+
+def _tree_files(store_dir, case):
+    """(tree, file name) of every canonical file of one case"""
+    store_dir = Path(store_dir)
+    image_name = Path(case['image_path']).name
+    file_ending = image_name[len(f"{case['case_id']}_0000"):]
+    files = []
+    for tree in TREES:
+        name = image_name if tree == 'imagesTr' else f"{case['case_id']}{file_ending}"
+        if (store_dir / tree / name).exists():
+            files.append((tree, name))
+    return files
+
+def plan_view(store_dir, layout='flat'):
+    """
+    Work out a view without touching the file system.
+    Returns {view subdirectory: {'links': {dst relative path: src path},
+    'num_training': pairs, 'plane': plane or None}}.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
+    store_dir = Path(store_dir).resolve()
+    with open(store_dir / 'dataset.json', 'r') as f:
+        dataset_name = json.load(f).get('dataset_name', 'Dataset')
+    catalog = CaseCatalog(store_dir)
+    cases = catalog.cases()
+    catalog.close()
+
+    views = {}
+    for case in cases:
+        if layout == 'flat':
+            subdir, plane, prefix = '', None, ''
+        elif case['plane'] is None:
+            continue
+        elif layout == 'planes':
+            subdir, plane, prefix = '', None, case['plane']
+        else:
+            subdir, plane, prefix = f"{dataset_name}_{case['plane']}", case['plane'], ''
+
+        view = views.setdefault(subdir, {'links': {}, 'num_training': 0, 'plane': plane})
+        files = _tree_files(store_dir, case)
+        trees = {tree for tree, _ in files}
+        if 'imagesTr' in trees and 'labelsTr' in trees:
+            view['num_training'] += 1
+        for tree, name in files:
+            dst = os.path.join(tree, prefix, name)
+            src = str(store_dir / tree / name)
+            if view['links'].get(dst, src) != src:
+                raise LayoutConflict(f"{dst} would link both {view['links'][dst]} and {src}")
+            view['links'][dst] = src
+    return views
+
+def _store_state(planned):
+    """Digest of the view's links and the inode, size and mtime of every source"""
+    digest = hashlib.sha256()
+    for rel_path, src in sorted(planned.items()):
+        st = os.stat(src)
+        digest.update(f"{rel_path}\0{src}\0{st.st_ino}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def _planned_links(store_dir, layout):
+    views = plan_view(store_dir, layout)
+    planned = {os.path.join(subdir, dst): src for subdir, view in views.items()
+               for dst, src in view['links'].items()}
+    return views, planned
+
+def find_view(path):
+    """Root of the layout view path belongs to (a view or one of its dataset folders), or None"""
+    path = Path(path)
+    for candidate in (path, path.parent):
+        if (candidate / VIEW_MARKER).exists():
+            return candidate
+    return None
+
+def check_view(view_dir):
+    """
+    Raise StaleView unless view_dir still matches its store: the same cases
+    and the same store files (inode, size, mtime) as when it was built.
+    Returns the view's marker.
+    """
+    marker_path = Path(view_dir) / VIEW_MARKER
+    with open(marker_path, 'r') as f:
+        marker = json.load(f)
+    try:
+        _, planned = _planned_links(marker['store'], marker['layout'])
+        stale = _store_state(planned) != marker.get('store_state')
+    except (FileNotFoundError, LayoutConflict):
+        stale = True
+    if stale:
+        raise StaleView(f"{view_dir} no longer matches {marker['store']}; "
+                        f"rebuild it with materialize_view(..., layout='{marker['layout']}')")
+    return marker
+
+def _is_link_to(dst, src, method):
+    if method == 'symlink':
+        return os.path.islink(dst) and os.readlink(dst) == src
+    return os.path.exists(dst) and not os.path.islink(dst) and os.path.samefile(dst, src)
+
+def materialize_view(store_dir, view_dir, layout='flat', method='hardlink'):
+    """
+    Build (or update) a layout view of store_dir in view_dir from hardlinks
+    or symlinks. Raises LayoutConflict before creating anything if a link
+    would clash with a file that isn't part of an earlier view.
+    Returns {view subdirectory: number of training pairs}.
+    """
+    if method not in ('hardlink', 'symlink'):
+        raise ValueError(f"Unsupported link method: {method}")
+    store_dir = Path(store_dir).resolve()
+    view_dir = Path(view_dir)
+    if view_dir.resolve() == store_dir or store_dir in view_dir.resolve().parents:
+        raise LayoutConflict(f"View directory {view_dir} must be outside the store {store_dir}")
+    marker_path = view_dir / VIEW_MARKER
+    if view_dir.exists() and any(view_dir.iterdir()) and not marker_path.exists():
+        raise LayoutConflict(f"{view_dir} exists and is not a layout view")
+
+    views, planned = _planned_links(store_dir, layout)
+
+    # Check the whole plan before creating a single link
+    previous = {}
+    if marker_path.exists():
+        with open(marker_path, 'r') as f:
+            previous = json.load(f)
+    owned = set(previous.get('links', []))
+    for rel_path, src in planned.items():
+        dst = view_dir / rel_path
+        if os.path.lexists(dst) and rel_path not in owned and not _is_link_to(dst, src, method):
+            raise LayoutConflict(f"{dst} already exists and is not part of this view")
+
+    # Drop links of the previous view that the new plan doesn't have
+    for rel_path in owned - set(planned):
+        if os.path.lexists(view_dir / rel_path):
+            os.unlink(view_dir / rel_path)
+
+    created = 0
+    for rel_path, src in planned.items():
+        dst = view_dir / rel_path
+        if _is_link_to(dst, src, method):
+            continue
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if method == 'symlink':
+            os.symlink(src, dst)
+        else:
+            os.link(src, dst)
+        created += 1
+
+    # One dataset.json per nnU-Net dataset folder of the view
+    with open(store_dir / 'dataset.json', 'r') as f:
+        base_json = json.load(f)
+    for subdir, view in views.items():
+        dataset_json = dict(base_json, numTraining=view['num_training'])
+        if view['plane'] is not None:
+            dataset_json['dataset_name'] = subdir
+            dataset_json['description'] = f"{base_json.get('description', '')} ({view['plane']} plane)".strip()
+        (view_dir / subdir).mkdir(parents=True, exist_ok=True)
+        with open(view_dir / subdir / 'dataset.json', 'w') as f:
+            json.dump(dataset_json, f, indent=2)
+
+    tmp_path = marker_path.with_name(marker_path.name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({'store': str(store_dir), 'layout': layout, 'method': method,
+                   'links': sorted(planned), 'store_state': _store_state(planned)}, f)
+    os.replace(tmp_path, marker_path)
+
+    print(f"{layout} view of {store_dir} in {view_dir}: {len(planned)} links ({created} new, {method})")
+    return {subdir: view['num_training'] for subdir, view in views.items()}
+
+if __name__ == "__main__":
+    store_dir = "nnunet_dataset"
+    for layout in LAYOUTS:
+        print(materialize_view(store_dir, f"nnunet_views/{layout}", layout))
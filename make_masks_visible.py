@@ -1,41 +1,18 @@
-import numpy as np
-from PIL import Image
-import os
+# Create visible versions of all masks. The converter can render these
+# directly (variants=label_render.DEFAULT_VARIANTS); this rebuilds them from
+# an existing labelsTr.
+from label_render import DEFAULT_VARIANTS, render_label_directory
 
-# Create visible versions of all masks
 labels_dir = 'nnunet_dataset/labelsTr'
 visible_dir = 'nnunet_dataset/labelsTr_visible'
 
-# Create visible directory
-os.makedirs(visible_dir, exist_ok=True)
-
 print("Converting all masks to visible format...")
 
-# Process all mask files
-mask_files = [f for f in os.listdir(labels_dir) if f.endswith('.png') and not f.endswith('_visible.png')]
-
-for i, mask_file in enumerate(mask_files, 1):
-    # Load original mask
-    mask_path = os.path.join(labels_dir, mask_file)
-    mask = np.array(Image.open(mask_path))
-    
-    # Create visible version with scaled values
-    visible_mask = np.zeros_like(mask, dtype=np.uint8)
-    
-    # Scale values for visibility:
-    # Background (0) -> 0 (black)
-    # Kidney (1) -> 128 (gray) 
-    # Cyst (2) -> 255 (white)
-    visible_mask[mask == 0] = 0    # Background stays black
-    visible_mask[mask == 1] = 128  # Kidney -> gray
-    visible_mask[mask == 2] = 255  # Cyst -> white
-    
-    # Save visible version
-    visible_path = os.path.join(visible_dir, mask_file)
-    Image.fromarray(visible_mask).save(visible_path)
-    
-    if i % 50 == 0 or i == len(mask_files):
-        print(f"Processed {i}/{len(mask_files)} masks")
+# Scale values for visibility:
+# Background (0) -> 0 (black)
+# Kidney (1) -> 128 (gray)
+# Cyst (2) -> 255 (white)
+render_label_directory(labels_dir, variants={'labelsTr_visible': DEFAULT_VARIANTS['labelsTr_visible']})
 
 print(f"\nDone! Visible masks saved to: {visible_dir}")
 print("\nIn the visible versions:")
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Pluggable output writers for nnU-Net images and label maps
+Each writer saves one array (or PIL image) per case and reports how many
+bytes it wrote and how long it took, so PNG tuning and raw NumPy formats
+can be compared on real data:
+
+  PngWriter(compress_level, strategy)   .png, zlib level 0-9 and strategy
+  NpyWriter()                           .npy, uncompressed, memory-mappable
+  NpzWriter()                           .npz, zlib-compressed NumPy archive
+
+Writers are plain picklable objects so they can be handed to worker
+processes. make_writer() builds one from a short spec string such as
+'png', 'png:level=9,strategy=rle', 'npy' or 'npz'.
+
+Every write goes to a temporary file beside the target and is renamed over
+it (atomic_path), so each rewritten output is a new inode: a hardlink to the
+previous file (a layout view, a passthrough source) keeps the old content
+whole instead of being overwritten under it.
+"""
+
+import os
+import time
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# zlib strategies accepted by PIL's PNG encoder ("compress_type")
+ZLIB_STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'huffman': zlib.Z_HUFFMAN_ONLY,
+    'rle': zlib.Z_RLE,
+    'fixed': zlib.Z_FIXED,
+}
+
+@contextmanager
+def atomic_path(path):
+    """Temporary path beside path, renamed over it if the block succeeds"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.lexists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+class OutputWriter(ABC):
+    """Base class: subclasses define file_ending, spec and save()"""
+
+    file_ending = None
+
+    @property
+    @abstractmethod
+    def spec(self):
+        """Spec string that make_writer() turns back into this writer"""
+
+    @abstractmethod
+    def save(self, data, path):
+        """Encode data (array or PIL image) to path"""
+
+    def write(self, data, path):
+        """Write data to path through a temporary file; returns (bytes written, seconds taken)"""
+        start = time.perf_counter()
+        with atomic_path(path) as tmp_path:
+            self.save(data, tmp_path)
+        return os.path.getsize(path), time.perf_counter() - start
+
+class PngWriter(OutputWriter):
+    """PNG via PIL with an optional zlib compression level and strategy"""
+
+    file_ending = '.png'
+
+    def __init__(self, compress_level=None, strategy=None):
+        if strategy is not None and strategy not in ZLIB_STRATEGIES:
+            raise ValueError(f"Unknown zlib strategy: {strategy}")
+        self.compress_level = compress_level
+        self.strategy = strategy
+
+    @property
+    def spec(self):
+        options = []
+        if self.compress_level is not None:
+            options.append(f"level={self.compress_level}")
+        if self.strategy is not None:
+            options.append(f"strategy={self.strategy}")
+        return 'png' + (':' + ','.join(options) if options else '')
+
+    def save(self, data, path):
+        img = data if isinstance(data, Image.Image) else Image.fromarray(data)
+        params = {}
+        if self.compress_level is not None:
+            params['compress_level'] = self.compress_level
+        if self.strategy is not None:
+            params['compress_type'] = ZLIB_STRATEGIES[self.strategy]
+        img.save(path, 'PNG', **params)
+
+class NpyWriter(OutputWriter):
+    """Uncompressed .npy, loadable with np.load(mmap_mode='r')"""
+
+    file_ending = '.npy'
+
+    @property
+    def spec(self):
+        return 'npy'
+
+    def save(self, data, path):
+        # Write through an open file so np.save doesn't append another suffix
+        with open(path, 'wb') as f:
+            np.save(f, np.asarray(data))
+
+class NpzWriter(OutputWriter):
+    """zlib-compressed .npz holding the array under the key 'data'"""
+
+    file_ending = '.npz'
+
+    @property
+    def spec(self):
+        return 'npz'
+
+    def save(self, data, path):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, data=np.asarray(data))
+
+def make_writer(spec=None):
+    """
+    Build a writer from a spec string ('png', 'png:level=9,strategy=rle',
+    'npy', 'npz'). Writer instances and None (default PNG) pass through.
+    """
+    if spec is None:
+        return PngWriter()
+    if not isinstance(spec, str):
+        return spec
+
+    kind, _, options = spec.partition(':')
+    if kind == 'npy':
+        return NpyWriter()
+    if kind == 'npz':
+        return NpzWriter()
+    if kind != 'png':
+        raise ValueError(f"Unknown writer: {spec}")
+
+    params = {}
+    for option in filter(None, options.split(',')):
+        key, _, value = option.partition('=')
+        if key == 'level':
+            params['compress_level'] = int(value)
+        elif key == 'strategy':
+            params['strategy'] = value
+        else:
+            raise ValueError(f"Unknown PNG writer option: {option}")
+    return PngWriter(**params)
+
+class WriterStats:
+    """Accumulated file count, bytes and write time for one writer"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def add(self, nbytes, seconds):
+        self.files += 1
+        self.bytes += nbytes
+        self.seconds += seconds
+
+    def summary(self):
+        rate = self.files / self.seconds if self.seconds > 0 else float('inf')
+        throughput = self.bytes / self.seconds / 1e6 if self.seconds > 0 else float('inf')
+        return (f"{self.spec}: {self.files} files, {self.bytes / 1e6:.2f} MB, "
+                f"{self.seconds:.2f} s ({rate:.0f} files/s, {throughput:.1f} MB/s)")
+
+def benchmark_writers(sample_paths, writer_specs, output_dir):
+    """
+    Decode each sample once, then time every writer on the same arrays.
+    Returns {spec: WriterStats}.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    arrays = [np.array(Image.open(path)) for path in sample_paths]
+
+    results = {}
+    for spec in writer_specs:
+        writer = make_writer(spec)
+        stats = WriterStats(writer.spec)
+        for i, array in enumerate(arrays):
+            path = output_dir / f"sample{i:05d}{writer.file_ending}"
+            stats.add(*writer.write(array, path))
+            path.unlink()
+        results[writer.spec] = stats
+    return results
+
+if __name__ == "__main__":
+    import tempfile
+
+    labels_dir = Path("nnunet_dataset/labelsTr")
+    sample_paths = sorted(labels_dir.rglob("*.png"))[:200]
+    candidates = ['png', 'png:level=9', 'png:level=9,strategy=rle', 'png:level=1,strategy=rle', 'npy', 'npz']
+
+    print(f"Benchmarking {len(candidates)} writers on {len(sample_paths)} label maps from {labels_dir}...")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        results = benchmark_writers(sample_paths, candidates, tmp_dir)
+    for stats in results.values():
+        print(f"  {stats.summary()}")
@@ -1,46 +1,18 @@
-import os
-import glob
+from compact_cases import compact_dataset
 
-def remove_no_annotation_files():
-    # Files to remove (cases without annotations)
-    cases_to_remove = ['case012_0000.png', 'case163_0000.png', 'case225_0000.png', 'case245_0000.png', 'case309_0000.png']
+def remove_no_annotation_files(renumber=False):
+    # Cases to remove (cases without annotations, see find_no_annotation_cases.py)
+    cases_to_remove = ['case012', 'case163', 'case225', 'case245', 'case309']
     
-    # Directories to clean
-    directories = [
-        'nnunet_dataset/imagesTr',
-        'nnunet_dataset/imagesTr/Axial',
-        'nnunet_dataset/imagesTr/Coronal',
-        'nnunet_dataset/labelsTr',
-        'nnunet_dataset/labelsTr/Axial',
-        'nnunet_dataset/labelsTr/Coronal',
-        'nnunet_dataset/labelsTr_colored',
-        'nnunet_dataset/labelsTr_colored/Axial',
-        'nnunet_dataset/labelsTr_colored/Coronal',
-        'nnunet_dataset/labelsTr_visible',
-        'nnunet_dataset/labelsTr_visible/Axial',
-        'nnunet_dataset/labelsTr_visible/Coronal'
-    ]
+    # Removed from imagesTr, labelsTr and every label mirror, flat or per plane.
+    # With renumber=True the remaining cases are compacted in the same operation.
+    plan = compact_dataset('nnunet_dataset', remove=cases_to_remove, renumber=renumber)
     
-    removed_files = []
+    for file_path in plan['deletes']:
+        print(f"Removed: {file_path}")
     
-    for directory in directories:
-        if os.path.exists(directory):
-            for case_file in cases_to_remove:
-                file_path = os.path.join(directory, case_file)
-                if os.path.exists(file_path):
-                    try:
-                        os.remove(file_path)
-                        removed_files.append(file_path)
-                        print(f"Removed: {file_path}")
-                    except Exception as e:
-                        print(f"Error removing {file_path}: {e}")
-                else:
-                    print(f"File not found: {file_path}")
-        else:
-            print(f"Directory not found: {directory}")
-    
-    print(f"\nTotal files removed: {len(removed_files)}")
-    return removed_files
+    print(f"\nTotal files removed: {len(plan['deletes'])}")
+    return plan['deletes']
 
 if __name__ == "__main__":
-    remove_no_annotation_files()
\ No newline at end of file
+    remove_no_annotation_files()
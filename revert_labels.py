@@ -4,6 +4,8 @@ import os
 import numpy as np
 from PIL import Image
 
+from label_remap import list_masks, print_report, remap_files
+
 def revert_labels():
     """Revert labelsTr_visible and labelsTr_colored back to original values"""
     
@@ -24,35 +26,13 @@ def revert_labels():
             
         print(f"\nReverting {dir_name}...")
         
-        # Get all PNG files
-        png_files = [f for f in os.listdir(dir_path) if f.endswith('.png')]
-        
-        for i, filename in enumerate(png_files):
-            file_path = os.path.join(dir_path, filename)
-            
-            try:
-                # Load the image
-                img = Image.open(file_path)
-                img_array = np.array(img)
-                
-                # Create new array with reverted values
-                new_array = np.zeros_like(img_array)
-                
-                for old_val, new_val in mapping.items():
-                    new_array[img_array == old_val] = new_val
-                
-                # Save the reverted image
-                new_img = Image.fromarray(new_array.astype(np.uint8))
-                new_img.save(file_path)
-                
-                if (i + 1) % 50 == 0:
-                    print(f"  Processed {i + 1}/{len(png_files)} files")
-                    
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
-                continue
+        # One lookup table per directory; values outside the mapping become 0.
+        # Paletted mirrors (paletted_variants=True) are reported as skipped:
+        # they keep class indices and already display through their palette.
+        report = remap_files(list_masks(dir_path), mapping, default=0, workers=os.cpu_count() or 1)
+        print_report(report)
         
-        print(f"Completed reverting {len(png_files)} files in {dir_name}")
+        print(f"Completed reverting {len(report)} files in {dir_name}")
     
     # Verify the results
     print("\nVerifying reverted values...")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Synthetic Roboflow-style COCO exports
+generate_coco() writes a directory that looks like train/: JPEG images with
+Roboflow file names (Name-_jpg.rf.<hash>.jpg), user tags for patient and
+plane, and an _annotations.coco.json with the same categories as the real
+export (0 objects, 1 cyst, 2 kidney). Image count, resolution, polygons per
+image, vertices per polygon and the share of RLE annotations are all
+configurable, so the converter and the verification scripts can be measured
+at sizes the 314-image set doesn't reach. Output is deterministic per seed.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from coco_rle import mask_to_rle
+
+CATEGORIES = [
+    {'id': 0, 'name': 'objects', 'supercategory': 'none'},
+    {'id': 1, 'name': 'cyst', 'supercategory': 'objects'},
+    {'id': 2, 'name': 'kidney', 'supercategory': 'objects'},
+]
+
+PLANES = ('Axial', 'Coronal')
+
+def _random_polygon(rng, width, height, vertices, max_radius):
+    """Star-shaped polygon as a flat COCO [x1, y1, x2, y2, ...] list"""
+    cx = rng.uniform(max_radius, width - max_radius)
+    cy = rng.uniform(max_radius, height - max_radius)
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+    radii = max_radius * rng.uniform(0.5, 1.0, vertices)
+    xs = np.clip(cx + radii * np.cos(angles), 0, width - 1)
+    ys = np.clip(cy + radii * np.sin(angles), 0, height - 1)
+    return np.round(np.column_stack((xs, ys)).ravel(), 3).tolist()
+
+def _polygon_mask(polygon, width, height):
+    canvas = Image.new('L', (width, height), 0)
+    points = [(polygon[i], polygon[i + 1]) for i in range(0, len(polygon), 2)]
+    ImageDraw.Draw(canvas).polygon(points, fill=1)
+    return np.array(canvas)
+
+def _annotation(ann_id, image_id, category_id, polygon, width, height, rle, compress):
+    xs, ys = polygon[0::2], polygon[1::2]
+    bbox = [min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)]
+    if rle:
+        mask = _polygon_mask(polygon, width, height)
+        segmentation = mask_to_rle(mask, compress=compress)
+        area = float(mask.sum())
+    else:
+        segmentation = [polygon]
+        # Shoelace formula
+        area = 0.5 * abs(float(np.dot(xs, np.roll(ys, 1)) - np.dot(ys, np.roll(xs, 1))))
+    return {
+        'id': ann_id,
+        'image_id': image_id,
+        'category_id': category_id,
+        'bbox': [round(v, 3) for v in bbox],
+        'area': round(area, 3),
+        'segmentation': segmentation,
+        'iscrowd': 1 if rle else 0,
+    }
+
+def _synthetic_image(rng, width, height):
+    """Greyscale-looking RGB scan: a smooth gradient with speckle noise"""
+    y, x = np.mgrid[0:height, 0:width]
+    gradient = 96 + 64 * np.sin(x / width * np.pi * rng.uniform(1, 3)) * np.cos(y / height * np.pi)
+    noise = rng.normal(0, 12, (height, width))
+    grey = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+    return Image.fromarray(grey).convert('RGB')
+
+def generate_coco(output_dir, num_images=100, width=512, height=512, polygons_per_image=(1, 4),
+                  vertices=(8, 32), rle_fraction=0.0, compressed_rle=True, seed=0, quality=90):
+    """
+    Write num_images synthetic JPEGs and their _annotations.coco.json to
+    output_dir. polygons_per_image and vertices are inclusive (min, max)
+    ranges; each annotation is a cyst or a kidney, and rle_fraction of them
+    are stored as RLE (compressed strings unless compressed_rle=False)
+    instead of polygons. Returns the path of the annotation file.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    max_radius = min(width, height) / 8
+
+    images, annotations = [], []
+    for image_id in range(num_images):
+        name = f"Cyst-{image_id + 1}-"
+        rf_hash = hashlib.md5(f"{seed}:{image_id}".encode()).hexdigest()
+        file_name = f"{name}_jpg.rf.{rf_hash}.jpg"
+        _synthetic_image(rng, width, height).save(output_dir / file_name, 'JPEG', quality=quality)
+        images.append({
+            'id': image_id,
+            'license': 1,
+            'file_name': file_name,
+            'height': height,
+            'width': width,
+            'date_captured': '2025-01-01T00:00:00+00:00',
+            'extra': {
+                'user_tags': [f"Patient{image_id % 20 + 1}", PLANES[image_id % len(PLANES)]],
+                'name': f"{name}.jpg",
+            },
+        })
+        for _ in range(rng.integers(polygons_per_image[0], polygons_per_image[1] + 1)):
+            polygon = _random_polygon(rng, width, height, int(rng.integers(vertices[0], vertices[1] + 1)), max_radius)
+            category_id = int(rng.integers(1, 3))
+            rle = rng.random() < rle_fraction
+            annotations.append(_annotation(len(annotations), image_id, category_id, polygon,
+                                           width, height, rle, compressed_rle))
+
+    coco = {
+        'info': {'description': f"Synthetic export (seed {seed})", 'version': '1'},
+        'licenses': [{'id': 1, 'url': 'https://creativecommons.org/licenses/by/4.0/', 'name': 'CC BY 4.0'}],
+        'categories': CATEGORIES,
+        'images': images,
+        'annotations': annotations,
+    }
+    json_path = output_dir / '_annotations.coco.json'
+    with open(json_path, 'w') as f:
+        json.dump(coco, f)
+    return json_path
+
+if __name__ == "__main__":
+    json_path = generate_coco("synthetic/train", num_images=50, rle_fraction=0.25)
+    with open(json_path, 'r') as f:
+        coco = json.load(f)
+    print(f"Wrote {len(coco['images'])} images and {len(coco['annotations'])} annotations to {json_path}")
@@ -1,11 +1,142 @@
 import numpy as np
 from PIL import Image
+import json
 import os
+from pathlib import Path
+
+from dataset_reader import load_array
+from image_headers import HeaderError, read_header
+from label_stats import collect_label_stats, value_counts
 
 # Final verification script for nnU-Net dataset
 
-def verify_nnunet_dataset():
-    """Verify that the dataset is properly formatted for nnU-Net training"""
+REPORT_NAME = "verification_report.json"
+
+def _image_size(path):
+    """(width, height) from the PNG/JPEG header or the shape of a .npy/.npz array"""
+    try:
+        if Path(path).suffix.lower() in ('.npy', '.npz'):
+            height, width = load_array(path).shape[:2]
+            return [width, height]
+        header = read_header(path)
+    except (OSError, ValueError, HeaderError) as e:
+        return str(e)
+    return [header['width'], header['height']]
+
+def verify_nnunet_dataset_full(dataset_dir='nnunet_dataset', workers=None, report_path=None):
+    """
+    Check every case of the dataset and collect all violations instead of
+    stopping at the first one: file naming, image/label pairing, label values
+    against dataset.json, image/label shape agreement and numTraining.
+    
+    Label values and shapes come from label_stats (one decode per label map,
+    cached across runs, .npy/.npz labels included); image shapes are read
+    from PNG/JPEG headers by image_headers, or from the array shape of
+    .npy/.npz images. Workers default to the CPU count. The report is
+    written as JSON to report_path (default
+    <dataset_dir>/verification_report.json) and returned.
+    """
+    dataset_dir = str(dataset_dir)
+    workers = workers or os.cpu_count() or 1
+    images_dir = os.path.join(dataset_dir, 'imagesTr')
+    labels_dir = os.path.join(dataset_dir, 'labelsTr')
+    violations = []
+    
+    def violation(check, message, case_id=None):
+        violations.append({'check': check, 'case_id': case_id, 'message': message})
+    
+    dataset_json = {}
+    dataset_json_path = os.path.join(dataset_dir, 'dataset.json')
+    try:
+        with open(dataset_json_path, 'r') as f:
+            dataset_json = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        violation('dataset_json', f"Cannot read {dataset_json_path}: {e}")
+    file_ending = dataset_json.get('file_ending', '.png')
+    allowed_values = set(dataset_json.get('labels', {'background': 0, 'kidney': 1, 'cyst': 2}).values())
+    
+    image_cases, label_cases = {}, {}
+    for dir_path, cases, suffix in ((images_dir, image_cases, f"_0000{file_ending}"),
+                                    (labels_dir, label_cases, file_ending)):
+        if not os.path.isdir(dir_path):
+            violation('structure', f"Missing required directory: {dir_path}")
+            continue
+        for name in sorted(os.listdir(dir_path)):
+            if os.path.isdir(os.path.join(dir_path, name)):
+                violation('structure', f"Unexpected subdirectory: {os.path.join(dir_path, name)}")
+            elif name.startswith('.'):
+                continue
+            elif (name.startswith('case') and name.endswith(suffix)
+                  and (dir_path == images_dir or '_0000' not in name)):
+                cases[name[:-len(suffix)]] = name
+            else:
+                violation('naming', f"Invalid filename: {os.path.join(dir_path, name)}")
+    
+    for case_id in sorted(set(label_cases) - set(image_cases)):
+        violation('pairing', "Label has no image", case_id)
+    for case_id in sorted(set(image_cases) - set(label_cases)):
+        violation('pairing', "Image has no label", case_id)
+    paired = sorted(set(image_cases) & set(label_cases))
+    
+    num_training = dataset_json.get('numTraining')
+    if dataset_json and num_training != len(paired):
+        violation('num_training', f"dataset.json numTraining is {num_training}, found {len(paired)} pairs")
+    
+    label_stats = {}
+    if os.path.isdir(labels_dir):
+        label_stats = collect_label_stats(labels_dir, workers=workers, file_ending=file_ending)
+    image_sizes = [_image_size(os.path.join(images_dir, image_cases[case_id])) for case_id in paired]
+    
+    for case_id, image_size in zip(paired, image_sizes):
+        record = label_stats.get(label_cases[case_id])
+        if record is None:
+            violation('label_values', "Label statistics unavailable", case_id)
+            continue
+        invalid = sorted(set(value_counts(record)) - allowed_values)
+        if invalid:
+            violation('label_values', f"Unexpected label values {invalid}", case_id)
+        if len(record['shape']) != 2:
+            violation('label_shape', f"Label is not single-channel: shape {record['shape']}", case_id)
+        if isinstance(image_size, str):
+            violation('image_read', f"Cannot read image: {image_size}", case_id)
+        elif [image_size[1], image_size[0]] != record['shape'][:2]:
+            violation('shape', f"Image is {image_size[1]}x{image_size[0]}, "
+                               f"label is {record['shape'][0]}x{record['shape'][1]}", case_id)
+    
+    report = {
+        'dataset_dir': dataset_dir,
+        'num_images': len(image_cases),
+        'num_labels': len(label_cases),
+        'num_pairs': len(paired),
+        'num_training': num_training,
+        'allowed_label_values': sorted(allowed_values),
+        'ok': not violations,
+        'violations': violations,
+    }
+    report_path = report_path or os.path.join(dataset_dir, REPORT_NAME)
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    print("=== nnU-Net Dataset Verification (full) ===")
+    print(f"Pairs checked: {len(paired)}")
+    if violations:
+        by_check = {}
+        for v in violations:
+            by_check[v['check']] = by_check.get(v['check'], 0) + 1
+        print(f"❌ {len(violations)} violations: {by_check}")
+    else:
+        print("✅ Dataset is properly formatted for nnU-Net training!")
+    print(f"Report: {report_path}")
+    return report
+
+def verify_nnunet_dataset(full=False):
+    """
+    Verify that the dataset is properly formatted for nnU-Net training.
+    full=True checks every case and writes a JSON report
+    (see verify_nnunet_dataset_full).
+    """
+    if full:
+        return verify_nnunet_dataset_full()['ok']
     
     print("=== nnU-Net Dataset Verification ===")
     print()
@@ -129,4 +260,5 @@ def verify_nnunet_dataset():
     return True
 
 if __name__ == "__main__":
-    verify_nnunet_dataset()
\ No newline at end of file
+    full = True  # False: quick check of the first 10 label maps only
+    verify_nnunet_dataset(full=full)
\ No newline at end of file
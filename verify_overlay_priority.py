@@ -1,23 +1,22 @@
 import numpy as np
 from PIL import Image
-import json
 from pathlib import Path
 
-# Load COCO annotations to find images with overlapping cyst and kidney regions
-with open('train/_annotations.coco.json', 'r') as f:
-    coco_data = json.load(f)
+from case_catalog import CaseCatalog
+from coco_index import CocoIndex
 
-# Group annotations by image
+# Load the shared COCO index to find images with overlapping cyst and kidney regions
+index = CocoIndex.load('train/_annotations.coco.json')
+# Case IDs come from the converter's catalog (registry IDs are not positional)
+catalog = CaseCatalog('nnunet_dataset')
+
+# Split each image's annotations by category
 image_annotations = {}
-for ann in coco_data['annotations']:
-    img_id = ann['image_id']
-    if img_id not in image_annotations:
-        image_annotations[img_id] = {'cyst': [], 'kidney': []}
-    
-    if ann['category_id'] == 1:  # cyst
-        image_annotations[img_id]['cyst'].append(ann)
-    elif ann['category_id'] == 2:  # kidney
-        image_annotations[img_id]['kidney'].append(ann)
+for img_id, annotations in index.annotations_by_image.items():
+    image_annotations[img_id] = {
+        'cyst': [ann for ann in annotations if ann['category_id'] == 1],
+        'kidney': [ann for ann in annotations if ann['category_id'] == 2],
+    }
 
 # Find images that have both cyst and kidney annotations
 mixed_images = []
@@ -32,11 +31,13 @@ check_count = min(5, len(mixed_images))
 print(f"\nChecking first {check_count} mixed images for overlay priority...")
 
 for i, img_id in enumerate(mixed_images[:check_count]):
-    # Find corresponding case number
-    img_info = next(img for img in coco_data['images'] if img['id'] == img_id)
-    case_num = str(img_id).zfill(3)
-    
-    mask_path = f'nnunet_dataset/labelsTr/case{case_num}.png'
+    # Find corresponding case
+    case = catalog.case_for_image(img_id)
+    if case is None:
+        print(f"\nImage {img_id}: no converted case (image dropped or missing)")
+        continue
+    case_id = case['case_id']
+    mask_path = case['label_path']
     
     if Path(mask_path).exists():
         mask = np.array(Image.open(mask_path))
@@ -46,7 +47,7 @@ for i, img_id in enumerate(mixed_images[:check_count]):
         kidney_pixels = np.sum(mask == 2)
         background_pixels = np.sum(mask == 0)
         
-        print(f"\nImage {img_id} (case{case_num}):")
+        print(f"\nImage {img_id} ({case_id}):")
         print(f"  Unique values: {unique_vals}")
         print(f"  Background pixels: {background_pixels}")
         print(f"  Cyst pixels (value 1): {cyst_pixels}")